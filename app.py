@@ -5,12 +5,13 @@ Crypto 自动化投研周报系统 - Streamlit 主界面
 import streamlit as st
 from datetime import datetime, timedelta
 import os
-from modules.data_fetcher import fetch_module_data, fetch_yahoo_data
-from modules.chart_builder import generate_module_charts
-from modules.utils import get_cache_info, clear_cache
-from modules.llm_writer import LLMWriter, ContentCache, prepare_btc_context, prepare_macro_context
-from modules.pdf_exporter import generate_report_pdf
-from modules.agent_graph import run_report_generation, get_workflow_visualization
+import json
+import heapq
+import traceback
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from modules.data_fetcher import fetch_module_data, fetch_modules_batch, fetch_yahoo_data
+from modules.utils import get_cache_info, clear_cache, pct_change, CACHE_DIR, CACHE_SUBDIRS
 
 # 页面配置
 st.set_page_config(
@@ -20,6 +21,154 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+
+# 本次脚本运行共享的时间戳 (避免同一次渲染内跨午夜导致的时间不一致)
+NOW = datetime.now()
+
+
+# ============= 缓存封装 =============
+
+def _fragment(run_every=None):
+    """st.fragment 兼容封装: 不支持 fragment 的旧版 Streamlit 退化为普通函数"""
+    decorator = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if decorator is None:
+        return lambda func: func
+    return decorator(run_every=run_every)
+
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _cached_yahoo(symbol: str, days: int) -> dict:
+    """Streamlit 内存缓存: 避免每次 rerun 重复请求 Yahoo Finance"""
+    return fetch_yahoo_data(symbol, days=days)
+
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _price_dataframe(symbol: str, days: int) -> pd.DataFrame:
+    """按 (symbol, days) 缓存价格表格, 避免每次 rerun 重建 DataFrame"""
+    data = _cached_yahoo(symbol, days)
+    return pd.DataFrame({
+        "日期": data['dates'],
+        "收盘价": data['close'],
+        "交易量": data['volume']
+    })
+
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _cached_module_data(module_name: str) -> dict:
+    """Streamlit 内存缓存: 按模块名缓存抓取结果"""
+    return fetch_module_data(module_name, {})
+
+
+@st.cache_data(ttl=900, show_spinner=False)
+def _cached_modules_batch(module_names: tuple) -> dict:
+    """Streamlit 内存缓存: 多模块批量抓取 (Yahoo 标的合并为一次请求)"""
+    return fetch_modules_batch(list(module_names), {})
+
+
+@st.cache_data(ttl=30, show_spinner=False)
+def _cache_info(dir_mtime: float) -> dict:
+    """缓存目录统计: 以目录 mtime 为键, 目录未变化时跳过逐文件 stat"""
+    return get_cache_info()
+
+
+@st.cache_resource(show_spinner=False)
+def get_llm_writer(model: str):
+    """按模型复用 LLMWriter (避免每次点击重新初始化 SDK 客户端)"""
+    from modules.llm_writer import LLMWriter
+    return LLMWriter(model=model)
+
+
+@st.cache_resource(show_spinner=False)
+def get_prefetch_executor():
+    """后台预处理任务共用的单线程执行器 (跨会话复用, 提交后不等待结果)"""
+    return ThreadPoolExecutor(max_workers=1, thread_name_prefix="pdf-prefetch")
+
+
+@st.cache_resource(show_spinner=False)
+def get_content_cache():
+    """复用 ContentCache 实例"""
+    from modules.llm_writer import ContentCache
+    return ContentCache()
+
+
+@st.cache_data(show_spinner=False)
+def _cache_info_html(count: int, total_size_mb: float, oldest: str, newest: str) -> str:
+    """侧边栏缓存统计 HTML: 统计值不变时直接复用"""
+    return f"""
+    <div class="cache-info">
+        <strong>缓存统计:</strong><br>
+        文件数量: {count}<br>
+        总大小: {total_size_mb} MB<br>
+        最早: {oldest}<br>
+        最新: {newest}
+    </div>
+    """
+
+
+def _show_error(msg: str, e: Exception):
+    """显示错误信息, 并在折叠面板中给出完整堆栈 (仅在异常发生时格式化)"""
+    st.error(f"{msg}: {str(e)}")
+    with st.expander("查看错误详情"):
+        st.code(traceback.format_exc())
+
+
+def _cache_dir_mtime() -> float:
+    """缓存根目录及各分目录缓存的最新修改时间 (目录不存在时为 0)"""
+    latest = 0.0
+    for path in (CACHE_DIR, *CACHE_SUBDIRS):
+        try:
+            latest = max(latest, os.path.getmtime(path))
+        except OSError:
+            continue
+    return latest
+
+
+IMAGES_DIR = "output/images"
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _latest_charts(prefix: str, limit: int, images_mtime: float) -> list:
+    """
+    扫描 output/images/<日期>/ 下指定前缀的最新图表
+
+    图表文件名按日固定, 只有新增日期目录时结果才会变化, 因此以根目录 mtime 为缓存键
+    """
+    candidates = []
+    try:
+        with os.scandir(IMAGES_DIR) as date_dirs:
+            for date_dir in date_dirs:
+                if not date_dir.is_dir():
+                    continue
+                with os.scandir(date_dir.path) as files:
+                    for f in files:
+                        if f.name.startswith(prefix) and f.name.endswith(".png"):
+                            candidates.append(f.path)
+    except FileNotFoundError:
+        return []
+
+    return heapq.nlargest(limit, candidates)
+
+
+@st.cache_data(max_entries=64, ttl=3600, show_spinner=False)
+def _read_bytes(path: str, mtime: float) -> bytes:
+    """读取文件字节: 以 (路径, mtime) 为键, 文件重新生成后自动失效; 限制条目数与存活时间, 旧版本图表不会常驻内存"""
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _png_bytes(path: str) -> bytes:
+    """图表下载按钮使用的字节 (内存缓存)"""
+    return _read_bytes(path, os.path.getmtime(path))
+
+
+def _images_dir_mtime() -> float:
+    """图表根目录的修改时间 (目录不存在时为 0)"""
+    try:
+        return os.path.getmtime(IMAGES_DIR)
+    except OSError:
+        return 0.0
+
+
 # 自定义CSS
 st.markdown("""
 <style>
@@ -56,7 +205,7 @@ with st.sidebar:
 
     # 日期范围选择
     st.subheader("📅 日期范围")
-    end_date = datetime.now()
+    end_date = NOW
     start_date = end_date - timedelta(days=30)
 
     date_range = st.date_input(
@@ -87,7 +236,7 @@ with st.sidebar:
     chart_dpi = st.select_slider(
         "图表分辨率 (DPI)",
         options=[150, 200, 250, 300, 350, 400],
-        value=300
+        value=150
     )
 
     show_watermark = st.checkbox("显示水印", value=True)
@@ -104,19 +253,20 @@ with st.sidebar:
 
     # 缓存管理
     st.subheader("💾 缓存管理")
-    cache_info = get_cache_info()
-    st.markdown(f"""
-    <div class="cache-info">
-        <strong>缓存统计:</strong><br>
-        文件数量: {cache_info['count']}<br>
-        总大小: {cache_info['total_size_mb']} MB<br>
-        最早: {cache_info['oldest']}<br>
-        最新: {cache_info['newest']}
-    </div>
-    """, unsafe_allow_html=True)
+    cache_info = _cache_info(_cache_dir_mtime())
+    st.markdown(
+        _cache_info_html(
+            cache_info['count'],
+            cache_info['total_size_mb'],
+            cache_info['oldest'],
+            cache_info['newest']
+        ),
+        unsafe_allow_html=True
+    )
 
     if st.button("🗑️ 清除所有缓存"):
         clear_cache()
+        _cache_info.clear()
         st.success("缓存已清除")
         st.rerun()
 
@@ -124,7 +274,7 @@ with st.sidebar:
 
     # 系统信息
     st.caption(f"版本: v0.1.0 (MVP)")
-    st.caption(f"更新: {datetime.now().strftime('%Y-%m-%d')}")
+    st.caption(f"更新: {NOW.strftime('%Y-%m-%d')}")
 
 
 # ============= 主界面 =============
@@ -132,33 +282,48 @@ with st.sidebar:
 # 快速统计面板
 st.markdown('<div class="section-header">📌 快速预览</div>', unsafe_allow_html=True)
 
-col1, col2, col3, col4 = st.columns(4)
-
-# 获取 BTC 最新价格
+# BTC 最近 7 天数据: 本次渲染内复用 (原始数据 / PDF 指标)
 try:
-    btc_data = fetch_yahoo_data("BTC-USD", days=7)
-    btc_price = btc_data['close'][-1]
-    btc_change = ((btc_data['close'][-1] / btc_data['close'][0]) - 1) * 100
-
-    with col1:
-        st.metric(
-            label="BTC 价格",
-            value=f"${btc_price:,.0f}",
-            delta=f"{btc_change:+.2f}% (7天)"
-        )
+    btc7 = _cached_yahoo("BTC-USD", 7)
+    btc7_error = None
 except Exception as e:
-    with col1:
-        st.metric(label="BTC 价格", value="加载中...", delta="--")
+    btc7 = None
+    btc7_error = e
 
-# 占位符指标
-with col2:
-    st.metric(label="ETF 净流入", value="加载中...", delta="--")
 
-with col3:
-    st.metric(label="鲸鱼吸筹", value="加载中...", delta="--")
+@_fragment(run_every=300)
+def _quick_preview(cache_count: int):
+    """快速预览指标: 作为 fragment 定时独立刷新, 不触发整页 rerun"""
+    col1, col2, col3, col4 = st.columns(4)
+
+    # 获取 BTC 最新价格
+    try:
+        btc_data = _cached_yahoo("BTC-USD", 7)
+        btc_price = btc_data['close'][-1]
+        btc_change = pct_change(btc_data['close'])
+
+        with col1:
+            st.metric(
+                label="BTC 价格",
+                value=f"${btc_price:,.0f}",
+                delta=f"{btc_change:+.2f}% (7天)"
+            )
+    except Exception as e:
+        with col1:
+            st.metric(label="BTC 价格", value="加载中...", delta="--")
 
-with col4:
-    st.metric(label="缓存文件", value=cache_info['count'], delta="--")
+    # 占位符指标
+    with col2:
+        st.metric(label="ETF 净流入", value="加载中...", delta="--")
+
+    with col3:
+        st.metric(label="鲸鱼吸筹", value="加载中...", delta="--")
+
+    with col4:
+        st.metric(label="缓存文件", value=cache_count, delta="--")
+
+
+_quick_preview(cache_info['count'])
 
 st.divider()
 
@@ -170,21 +335,54 @@ if not selected_modules:
     st.warning("请在侧边栏至少选择一个报告模块")
 else:
     if st.button("🚀 生成图表", type="primary", use_container_width=True):
+        # 按需导入: 点击生成图表时才加载 Matplotlib
+        from modules.chart_builder import generate_module_charts
+
         progress_bar = st.progress(0)
         status_text = st.empty()
 
-        for idx, module in enumerate(selected_modules):
-            try:
-                status_text.text(f"正在处理模块: {module.upper()}...")
-                progress_bar.progress((idx + 1) / len(selected_modules))
+        total_steps = len(selected_modules) * 2
+        done_steps = 0
+        data_by_module = {}
+        charts_by_module = {}
+        errors_by_module = {}
 
-                # 获取数据
-                with st.spinner(f"正在获取 {module} 模块数据..."):
-                    data = fetch_module_data(module, {})
+        # 阶段 1: 批量获取数据 (共享数据源的标的合并为一次请求, 其余数据源并发)
+        status_text.text(f"正在获取模块数据: {', '.join(m.upper() for m in selected_modules)}...")
+        try:
+            data_by_module.update(_cached_modules_batch(tuple(selected_modules)))
+        except Exception as e:
+            errors_by_module.update({m: e for m in selected_modules})
+        for module in selected_modules:
+            if module not in data_by_module and module not in errors_by_module:
+                errors_by_module[module] = RuntimeError("数据获取失败")
+        done_steps += len(selected_modules)
+        progress_bar.progress(done_steps / total_steps)
+
+        # 阶段 2: 并发生成图表 (各模块的图表由 chart_builder 的共享进程池渲染)
+        if data_by_module:
+            status_text.text("正在生成图表...")
+            with ThreadPoolExecutor(max_workers=len(data_by_module)) as executor:
+                futures = {
+                    executor.submit(generate_module_charts, m, d): m
+                    for m, d in data_by_module.items()
+                }
+                for future in as_completed(futures):
+                    module = futures[future]
+                    try:
+                        charts_by_module[module] = future.result()
+                    except Exception as e:
+                        errors_by_module[module] = e
+                    done_steps += 1
+                    progress_bar.progress(done_steps / total_steps)
+
+        for module in selected_modules:
+            if module in errors_by_module:
+                st.error(f"❌ {module.upper()} 模块处理失败: {str(errors_by_module[module])}")
+                continue
 
-                # 生成图表
-                with st.spinner(f"正在生成 {module} 模块图表..."):
-                    chart_paths = generate_module_charts(module, data)
+            try:
+                chart_paths = charts_by_module.get(module, [])
 
                 # 显示图表
                 if chart_paths:
@@ -194,50 +392,46 @@ else:
                     if len(chart_paths) == 1:
                         st.image(chart_paths[0], use_container_width=True)
                         # 添加下载按钮
-                        with open(chart_paths[0], "rb") as f:
-                            st.download_button(
-                                label="📥 下载图表",
-                                data=f,
-                                file_name=os.path.basename(chart_paths[0]),
-                                mime="image/png"
-                            )
+                        st.download_button(
+                            label="📥 下载图表",
+                            data=_png_bytes(chart_paths[0]),
+                            file_name=os.path.basename(chart_paths[0]),
+                            mime="image/png"
+                        )
 
                     elif len(chart_paths) == 2:
                         col1, col2 = st.columns(2)
                         with col1:
                             st.image(chart_paths[0], use_container_width=True)
-                            with open(chart_paths[0], "rb") as f:
-                                st.download_button(
-                                    label="📥 下载",
-                                    data=f,
-                                    file_name=os.path.basename(chart_paths[0]),
-                                    mime="image/png",
-                                    key=f"download_{chart_paths[0]}"
-                                )
+                            st.download_button(
+                                label="📥 下载",
+                                data=_png_bytes(chart_paths[0]),
+                                file_name=os.path.basename(chart_paths[0]),
+                                mime="image/png",
+                                key=f"download_{chart_paths[0]}"
+                            )
                         with col2:
                             st.image(chart_paths[1], use_container_width=True)
-                            with open(chart_paths[1], "rb") as f:
-                                st.download_button(
-                                    label="📥 下载",
-                                    data=f,
-                                    file_name=os.path.basename(chart_paths[1]),
-                                    mime="image/png",
-                                    key=f"download_{chart_paths[1]}"
-                                )
+                            st.download_button(
+                                label="📥 下载",
+                                data=_png_bytes(chart_paths[1]),
+                                file_name=os.path.basename(chart_paths[1]),
+                                mime="image/png",
+                                key=f"download_{chart_paths[1]}"
+                            )
 
                     else:
                         # 多张图表:使用 expander 折叠显示
                         for idx, chart_path in enumerate(chart_paths, 1):
                             with st.expander(f"图表 {idx}: {os.path.basename(chart_path)}", expanded=(idx<=2)):
                                 st.image(chart_path, use_container_width=True)
-                                with open(chart_path, "rb") as f:
-                                    st.download_button(
-                                        label="📥 下载此图表",
-                                        data=f,
-                                        file_name=os.path.basename(chart_path),
-                                        mime="image/png",
-                                        key=f"download_{idx}_{chart_path}"
-                                    )
+                                st.download_button(
+                                    label="📥 下载此图表",
+                                    data=_png_bytes(chart_path),
+                                    file_name=os.path.basename(chart_path),
+                                    mime="image/png",
+                                    key=f"download_{idx}_{chart_path}"
+                                )
 
                     st.success(f"✅ {module.upper()} 模块完成 ({len(chart_paths)} 张图表)")
                 else:
@@ -279,6 +473,9 @@ with col3:
     enable_llm = st.checkbox("启用 LLM", value=False)
 
 if enable_llm:
+    # 按需导入: 未启用 LLM 时不加载相关模块
+    from modules.llm_writer import prepare_btc_context, prepare_macro_context
+
     # 检查 API Key
     api_key_available = False
     if llm_model.startswith("gpt"):
@@ -293,11 +490,11 @@ if enable_llm:
             try:
                 with st.spinner("正在生成文案..."):
                     # 初始化 LLM Writer
-                    writer = LLMWriter(model=llm_model)
+                    writer = get_llm_writer(llm_model)
 
                     # 获取数据
-                    btc_data = fetch_yahoo_data("BTC-USD", days=30)
-                    macro_data_raw = fetch_module_data("macro", {})
+                    btc_data = _cached_yahoo("BTC-USD", 30)
+                    macro_data_raw = _cached_module_data("macro")
 
                     # 准备上下文
                     btc_context = prepare_btc_context(btc_data)
@@ -309,10 +506,18 @@ if enable_llm:
                         {"type": "macro_analysis", "context": macro_context}
                     ]
 
+                    # 已启用 PDF 导出时, 在后台预处理 PDF 所需图表 (缩放/编码), 不等待其完成;
+                    # 之后导出 PDF 直接命中缓存
+                    if st.session_state.get("enable_pdf"):
+                        from modules.pdf_exporter import prepare_chart_assets
+                        get_prefetch_executor().submit(
+                            prepare_chart_assets, _latest_charts("macro_", 2, _images_dir_mtime())
+                        )
+
                     results = writer.generate_batch(tasks)
 
                     # 保存到缓存
-                    cache = ContentCache()
+                    cache = get_content_cache()
                     cache_path = cache.save(results)
 
                     # 显示结果
@@ -329,37 +534,37 @@ if enable_llm:
                         st.markdown(results.get("macro_analysis", "生成失败"))
 
                     # 下载按钮
-                    import json
                     content_json = json.dumps(results, ensure_ascii=False, indent=2)
                     st.download_button(
                         label="📥 下载文案 (JSON)",
                         data=content_json,
-                        file_name=f"content_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                        file_name=f"content_{NOW.strftime('%Y%m%d_%H%M%S')}.json",
                         mime="application/json"
                     )
 
             except Exception as e:
-                st.error(f"❌ 文案生成失败: {str(e)}")
-                import traceback
-                with st.expander("查看错误详情"):
-                    st.code(traceback.format_exc())
-
-        # 历史版本管理
-        with st.expander("📚 历史文案版本"):
-            cache = ContentCache()
-            versions = cache.list_versions()
-
-            if not versions:
-                st.info("暂无历史版本")
-            else:
-                for v in versions[:5]:  # 只显示最近 5 个版本
-                    col1, col2 = st.columns([3, 1])
-                    with col1:
-                        st.text(f"版本: {v['version']} ({v['timestamp']})")
-                    with col2:
-                        if st.button("加载", key=f"load_{v['version']}"):
-                            loaded = cache.load(v['version'])
-                            st.json(loaded['content'])
+                _show_error("❌ 文案生成失败", e)
+
+        # 历史版本管理 (fragment: 点击"加载"只重跑本区域)
+        @_fragment()
+        def _content_history():
+            with st.expander("📚 历史文案版本"):
+                cache = get_content_cache()
+                versions = cache.list_versions()
+
+                if not versions:
+                    st.info("暂无历史版本")
+                else:
+                    for v in versions[:5]:  # 只显示最近 5 个版本
+                        col1, col2 = st.columns([3, 1])
+                        with col1:
+                            st.text(f"版本: {v['version']} ({v['timestamp']})")
+                        with col2:
+                            if st.button("加载", key=f"load_{v['version']}"):
+                                loaded = cache.load(v['version'])
+                                st.json(loaded['content'])
+
+        _content_history()
 
 # ============= 数据表格预览 (可选) =============
 
@@ -367,13 +572,7 @@ with st.expander("📋 查看原始数据"):
     st.markdown("### BTC 价格数据 (最近7天)")
 
     try:
-        btc_data = fetch_yahoo_data("BTC-USD", days=7)
-        import pandas as pd
-        df = pd.DataFrame({
-            "日期": btc_data['dates'],
-            "收盘价": btc_data['close'],
-            "交易量": btc_data['volume']
-        })
+        df = _price_dataframe("BTC-USD", 7)
         st.dataframe(df, use_container_width=True)
     except Exception as e:
         st.error(f"无法加载数据: {e}")
@@ -389,9 +588,12 @@ with col1:
     st.info("生成专业的 PDF 周报，包含所有图表和文案")
 
 with col2:
-    enable_pdf = st.checkbox("启用 PDF", value=False)
+    enable_pdf = st.checkbox("启用 PDF", value=False, key="enable_pdf")
 
 if enable_pdf:
+    # 按需导入: 未启用 PDF 时不加载 Jinja2 / WeasyPrint 相关模块
+    from modules.pdf_exporter import generate_report_pdf
+
     if st.button("📥 生成 PDF 报告", type="primary", use_container_width=True):
         try:
             with st.spinner("正在生成 PDF..."):
@@ -400,27 +602,28 @@ if enable_pdf:
                 content = {}
 
                 # 获取图表路径
-                import glob
-                macro_charts = glob.glob("output/images/*/macro_*.png")
+                macro_charts = _latest_charts("macro_", 2, _images_dir_mtime())
                 if macro_charts:
-                    chart_paths["macro"] = sorted(macro_charts, reverse=True)[:2]
+                    chart_paths["macro"] = macro_charts
 
                 # 获取文案
-                cache = ContentCache()
+                cache = get_content_cache()
                 versions = cache.list_versions()
                 if versions:
                     latest = cache.load(versions[0]["version"])
                     content = latest.get("content", {})
 
                 # 准备指标
-                btc_data = fetch_yahoo_data("BTC-USD", days=7)
-                btc_price = btc_data["close"][-1]
-                btc_change = ((btc_data["close"][-1] - btc_data["close"][-7]) / btc_data["close"][-7] * 100) if len(btc_data["close"]) >= 7 else 0
+                if btc7 is None:
+                    raise btc7_error
+                btc_price = btc7["close"][-1]
+                btc_change = pct_change(btc7["close"], 7)
 
+                chart_count = sum(map(len, chart_paths.values()))
                 metrics = [
                     {"label": "BTC 价格", "value": f"${btc_price:,.0f}", "delta": f"{btc_change:+.2f}%"},
                     {"label": "报告模块", "value": str(len(chart_paths)), "delta": "--"},
-                    {"label": "图表数量", "value": str(sum(len(c) for c in chart_paths.values())), "delta": "--"}
+                    {"label": "图表数量", "value": str(chart_count), "delta": "--"}
                 ]
 
                 # 生成 PDF
@@ -432,20 +635,22 @@ if enable_pdf:
 
                 st.success(f"✅ PDF 已生成: {pdf_path}")
 
-                # 下载按钮
+                # 只读盘一次, 之后的 rerun 直接使用内存中的字节
                 with open(pdf_path, "rb") as f:
-                    st.download_button(
-                        label="📥 下载 PDF",
-                        data=f,
-                        file_name=os.path.basename(pdf_path),
-                        mime="application/pdf"
-                    )
+                    st.session_state["pdf_bytes"] = f.read()
+                st.session_state["pdf_name"] = os.path.basename(pdf_path)
 
         except Exception as e:
-            st.error(f"❌ PDF 生成失败: {str(e)}")
-            with st.expander("查看错误详情"):
-                import traceback
-                st.code(traceback.format_exc())
+            _show_error("❌ PDF 生成失败", e)
+
+    # 下载按钮 (跨 rerun 保留最近一次生成的 PDF)
+    if "pdf_bytes" in st.session_state:
+        st.download_button(
+            label="📥 下载 PDF",
+            data=st.session_state["pdf_bytes"],
+            file_name=st.session_state["pdf_name"],
+            mime="application/pdf"
+        )
 
 # ============= Multi-Agent 工作流 =============
 
@@ -461,6 +666,10 @@ with col2:
     enable_agent = st.checkbox("启用 Agent", value=False)
 
 if enable_agent:
+    # 按需导入: 未启用 Agent 时不加载 LangGraph
+    from modules.agent_graph import run_report_generation, get_workflow_visualization
+    from modules.agent_state import get_content
+
     # 显示工作流可视化
     with st.expander("📊 查看工作流结构"):
         st.markdown("```mermaid\n" + get_workflow_visualization() + "\n```")
@@ -472,7 +681,7 @@ if enable_agent:
             status_text = st.empty()
 
             # 确定报告周期
-            today = datetime.now()
+            today = NOW
             week_start = (today - timedelta(days=7)).strftime("%Y-%m-%d")
             week_end = today.strftime("%Y-%m-%d")
             report_period = f"{week_start} ~ {week_end}"
@@ -495,13 +704,13 @@ if enable_agent:
             with col2:
                 st.metric("辩论轮数", final_state.get("debate_rounds", 0))
             with col3:
-                chart_count = sum(len(charts) for charts in final_state.get("chart_paths", {}).values())
-                st.metric("生成图表", chart_count)
+                st.metric("生成图表", final_state.get("chart_count", 0))
 
             # 显示生成的文案
-            if final_state.get("final_content"):
+            final_content = get_content(final_state)
+            if final_content:
                 st.markdown("### 📝 生成的文案")
-                for key, text in final_state["final_content"].items():
+                for key, text in final_content.items():
                     with st.expander(f"{key}", expanded=True):
                         st.markdown(text)
 
@@ -512,10 +721,7 @@ if enable_agent:
                     st.text(f"• {issue}")
 
         except Exception as e:
-            st.error(f"❌ 工作流执行失败: {str(e)}")
-            with st.expander("查看错误详情"):
-                import traceback
-                st.code(traceback.format_exc())
+            _show_error("❌ 工作流执行失败", e)
 
 # ============= 页脚 =============
 
@@ -4,32 +4,75 @@ LangGraph Multi-Agent 工作流编排
 使用 LangGraph 构建 Agent 协作的状态图
 """
 
+import os
+import pickle
+import asyncio
 import logging
-from typing import Dict
+from functools import lru_cache
+from typing import Any, Dict, Tuple
 from langgraph.graph import StateGraph, END
-from modules.agent_state import AgentState, create_initial_state
+from modules.agent_state import AgentState, create_initial_state, get_content
 from modules.agent_nodes import (
     chief_editor_node,
+    fetch_one_node,
     data_engineer_node,
+    chart_one_node,
     chartist_node,
     senior_analyst_node,
     debate_node,
     route_after_chief_editor,
-    route_after_debate
+    route_after_debate,
+    fanout_charts
 )
 
 logger = logging.getLogger(__name__)
 
+# checkpoint 单个值的大小上限, 超过说明有异常大对象 (如 Figure) 混入状态
+CHECKPOINT_MAX_BYTES = 50 * 1024 * 1024
+
+
+class PickleSerializer:
+    """
+    LangGraph checkpoint 序列化器 (实现 SerializerProtocol)
+
+    状态中都是 Python 原生结构, 用 pickle 代替默认的 JSON 编码
+    """
+
+    def dumps(self, obj: Any) -> bytes:
+        blob = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > CHECKPOINT_MAX_BYTES:
+            raise ValueError(f"checkpoint 过大 ({len(blob) / 1024 / 1024:.1f} MB), 请检查状态中是否混入了大对象")
+        return blob
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return "pickle", self.dumps(obj)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        _, blob = data
+        return self.loads(blob)
+
+
+def _checkpointer():
+    """设置 RF_CHECKPOINT=1 时启用内存 checkpoint (pickle 序列化), 默认不保存 checkpoint"""
+    if os.environ.get("RF_CHECKPOINT") != "1":
+        return None
+
+    from langgraph.checkpoint.memory import MemorySaver
+    return MemorySaver(serde=PickleSerializer())
+
 
 def create_workflow() -> StateGraph:
     """
     创建 Multi-Agent 工作流
 
     工作流结构：
-    1. Chief Editor (初始化) → Data Engineer
-    2. Data Engineer (数据抓取) → Chartist
-    3. Chartist (图表生成) → Senior Analyst
-    4. Senior Analyst (文案生成) → Chief Editor (审核)
+    1. Chief Editor (初始化) → 按模块并行 fetch_one (Send 分发)
+    2. Data Engineer (汇总数据) → 按模块并行 chart_one (Send 分发)
+    3. Chartist (汇总图表) → Senior Analyst
+    4. Senior Analyst (并发生成各部分文案) → Chief Editor (审核)
     5. Chief Editor (审核) → Debate (如果有问题)
     6. Debate → Senior Analyst (改进) 或 END (达成共识)
 
@@ -41,7 +84,9 @@ def create_workflow() -> StateGraph:
 
     # 添加节点
     workflow.add_node("chief_editor", chief_editor_node)
+    workflow.add_node("fetch_one", fetch_one_node)
     workflow.add_node("data_engineer", data_engineer_node)
+    workflow.add_node("chart_one", chart_one_node)
     workflow.add_node("chartist", chartist_node)
     workflow.add_node("senior_analyst", senior_analyst_node)
     workflow.add_node("debate", debate_node)
@@ -51,19 +96,32 @@ def create_workflow() -> StateGraph:
 
     # 添加边（定义工作流路径）
 
-    # Chief Editor 的条件路由
+    # Chief Editor 的条件路由（数据采集阶段按模块 Send 并行分发）
     workflow.add_conditional_edges(
         "chief_editor",
         route_after_chief_editor,
         {
-            "data_engineer": "data_engineer",
+            "fetch_one": "fetch_one",
             "debate": "debate",
             "end": END
         }
     )
 
-    # Data Engineer → Chartist
-    workflow.add_edge("data_engineer", "chartist")
+    # fetch_one (并行) → Data Engineer (汇总)
+    workflow.add_edge("fetch_one", "data_engineer")
+
+    # Data Engineer → 按模块并行 chart_one
+    workflow.add_conditional_edges(
+        "data_engineer",
+        fanout_charts,
+        {
+            "chart_one": "chart_one",
+            "chartist": "chartist"
+        }
+    )
+
+    # chart_one (并行) → Chartist (汇总)
+    workflow.add_edge("chart_one", "chartist")
 
     # Chartist → Senior Analyst
     workflow.add_edge("chartist", "senior_analyst")
@@ -82,16 +140,36 @@ def create_workflow() -> StateGraph:
     )
 
     # 编译工作流
-    app = workflow.compile()
+    app = workflow.compile(checkpointer=_checkpointer())
 
     logger.info("✅ Multi-Agent 工作流已创建")
 
     return app
 
 
+@lru_cache(maxsize=1)
+def _compiled_workflow():
+    """编译一次工作流并在多次运行间复用"""
+    return create_workflow()
+
+
 def run_report_generation(report_period: str, verbose: bool = True) -> AgentState:
     """
-    运行完整的报告生成工作流
+    运行完整的报告生成工作流（同步入口）
+
+    Args:
+        report_period: 报告周期 (e.g., "2024-12-01 ~ 2024-12-07")
+        verbose: 是否打印详细日志
+
+    Returns:
+        最终状态
+    """
+    return asyncio.run(arun_report_generation(report_period, verbose=verbose))
+
+
+async def arun_report_generation(report_period: str, verbose: bool = True) -> AgentState:
+    """
+    异步运行完整的报告生成工作流（部分节点为 async，需使用 astream/ainvoke）
 
     Args:
         report_period: 报告周期 (e.g., "2024-12-01 ~ 2024-12-07")
@@ -104,36 +182,39 @@ def run_report_generation(report_period: str, verbose: bool = True) -> AgentStat
     logger.info("🚀 启动 Multi-Agent 报告生成工作流")
     logger.info("=" * 60)
 
-    # 创建工作流
-    app = create_workflow()
+    # 获取已编译的工作流
+    app = _compiled_workflow()
 
     # 创建初始状态
     initial_state = create_initial_state(report_period)
+    config = {"configurable": {"thread_id": initial_state["task_id"]}}
 
     # 运行工作流
     try:
-        final_state = None
-        step_count = 0
+        if verbose:
+            final_state = None
+            step_count = 0
 
-        for state in app.stream(initial_state):
-            step_count += 1
-            if verbose:
+            async for state in app.astream(initial_state, config):
+                step_count += 1
                 current_step = list(state.keys())[0] if state else "unknown"
                 logger.info(f"步骤 {step_count}: {current_step}")
-
-            final_state = state
+                final_state = state
+
+            # 提取最终状态（stream 返回的是 {节点名: 状态}）
+            if isinstance(final_state, dict):
+                # 获取最后一个节点的状态
+                final_node_state = list(final_state.values())[0]
+            else:
+                final_node_state = final_state
+        else:
+            # 无需逐步日志时直接执行完整图，ainvoke 返回最终状态
+            final_node_state = await app.ainvoke(initial_state, config)
 
         logger.info("=" * 60)
         logger.info("✅ 工作流执行完成")
         logger.info("=" * 60)
 
-        # 提取最终状态（LangGraph 返回的是 dict of states）
-        if isinstance(final_state, dict):
-            # 获取最后一个节点的状态
-            final_node_state = list(final_state.values())[0]
-        else:
-            final_node_state = final_state
-
         return final_node_state
 
     except Exception as e:
@@ -143,37 +224,45 @@ def run_report_generation(report_period: str, verbose: bool = True) -> AgentStat
         raise
 
 
-def get_workflow_visualization() -> str:
-    """
-    获取工作流的 Mermaid 可视化图
-
-    Returns:
-        Mermaid 图表语法
-    """
-    mermaid = """
+# 工作流的 Mermaid 可视化 (常量, 模块加载时构建一次)
+WORKFLOW_MERMAID = """
 graph TD
     Start([开始]) --> ChiefEditor[Chief Editor<br/>任务分配]
-    ChiefEditor --> DataEngineer[Data Engineer<br/>数据抓取]
-    DataEngineer --> Chartist[Chartist<br/>图表生成]
+    ChiefEditor -->|Send 按模块并行| FetchOne[fetch_one × N<br/>数据抓取]
+    FetchOne --> DataEngineer[Data Engineer<br/>数据汇总]
+    DataEngineer -->|Send 按模块并行| ChartOne[chart_one × N<br/>图表生成]
+    DataEngineer -->|无数据| Chartist
+    ChartOne --> Chartist[Chartist<br/>图表汇总]
     Chartist --> Analyst[Senior Analyst<br/>文案生成]
     Analyst --> Review[Chief Editor<br/>质量审核]
 
     Review -->|质量合格| End([结束])
     Review -->|需要改进| Debate[Debate Node<br/>辩论改进]
     Debate -->|未达成共识| Analyst
-    Debate -->|达成共识| End
+    Debate -->|达成共识| Review
 
     style ChiefEditor fill:#3498db
+    style FetchOne fill:#2ecc71
     style DataEngineer fill:#2ecc71
+    style ChartOne fill:#f39c12
     style Chartist fill:#f39c12
     style Analyst fill:#9b59b6
     style Debate fill:#e74c3c
+"""
+
+
+def get_workflow_visualization() -> str:
+    """
+    获取工作流的 Mermaid 可视化图
+
+    Returns:
+        Mermaid 图表语法
     """
-    return mermaid
+    return WORKFLOW_MERMAID
 
 
-if __name__ == "__main__":
-    # 测试工作流
+if __name__ == "__main__" and os.environ.get("RUN_SMOKE"):
+    # 测试工作流（完整运行耗时较长，需设置 RUN_SMOKE=1 才会执行）
     logging.basicConfig(
         level=logging.INFO,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -190,7 +279,7 @@ if __name__ == "__main__":
     print(f"质量评分: {final_state.get('quality_score', 0):.1f}/100")
     print(f"辩论轮数: {final_state.get('debate_rounds', 0)}")
     print(f"审批状态: {final_state.get('approval_status', 'unknown')}")
-    print(f"图表数量: {sum(len(charts) for charts in final_state.get('chart_paths', {}).values())}")
-    print(f"文案段落: {len(final_state.get('final_content', {}))}")
+    print(f"图表数量: {final_state.get('chart_count', 0)}")
+    print(f"文案段落: {len(get_content(final_state))}")
     print(f"错误数量: {len(final_state.get('errors', []))}")
     print("=" * 60)
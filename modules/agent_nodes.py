@@ -4,15 +4,77 @@ LangGraph Multi-Agent 节点
 定义工作流中的各个 Agent 及其职责
 """
 
+import os
+import time
+import pickle
+import asyncio
+import hashlib
 import logging
-from typing import Dict
-from modules.agent_state import AgentState, add_message, calculate_quality_score
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+from dotenv import load_dotenv
+from langgraph.types import Send
+from modules.agent_state import AgentState, add_message, add_issue, clear_issues, calculate_quality_score
 from modules.data_fetcher import fetch_module_data
-from modules.chart_builder import generate_module_charts
-from modules.llm_writer import LLMWriter, prepare_btc_context, prepare_macro_context
+from modules.llm_writer import (
+    LLMWriter, data_fingerprint, memoized_context, prepare_btc_context, prepare_macro_context
+)
+from modules.utils import CACHE_DIR
 
 logger = logging.getLogger(__name__)
 
+# 工作流抓取的报告模块
+MODULES = ["macro", "btc"]
+
+# 模块原始数据的磁盘缓存 (数据结构变化时递增版本号使旧缓存失效)
+RAW_DATA_SCHEMA_VERSION = "1"
+RAW_DATA_CACHE_TTL_HOURS = 12
+
+
+# ==================== 原始数据缓存 ====================
+
+def _raw_data_cache_path(module: str, report_period: str) -> str:
+    """按 模块 + 报告周期 + schema 版本 生成内容寻址的缓存路径"""
+    key = hashlib.md5(f"{module}|{report_period}|{RAW_DATA_SCHEMA_VERSION}".encode()).hexdigest()
+    return os.path.join(CACHE_DIR, f"raw_data_{key}.pkl")
+
+
+def _raw_data_cache_enabled() -> bool:
+    """设置 RF_CACHE_DISABLE=1 可关闭原始数据缓存"""
+    return os.environ.get("RF_CACHE_DISABLE") != "1"
+
+
+def _load_raw_data_cache(path: str) -> Optional[Dict]:
+    """读取未过期的原始数据缓存, 不存在或已过期返回 None"""
+    if not _raw_data_cache_enabled() or not os.path.exists(path):
+        return None
+
+    if time.time() - os.path.getmtime(path) >= RAW_DATA_CACHE_TTL_HOURS * 3600:
+        return None
+
+    try:
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"读取原始数据缓存失败: {path}, 错误: {e}")
+        return None
+
+
+def _save_raw_data_cache(path: str, data: Dict):
+    """保存原始数据缓存 (失败只记录警告)"""
+    if not _raw_data_cache_enabled():
+        return
+
+    # 先写临时文件再原子替换, 并发读取不会读到写了一半的文件
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"原始数据缓存保存失败: {path}, 错误: {e}")
+
 
 # ==================== Agent 节点 ====================
 
@@ -46,11 +108,11 @@ def chief_editor_node(state: AgentState) -> AgentState:
         if quality_score >= 80:
             state["approval_status"] = "approved"
             state["consensus_reached"] = True
-            state["final_content"] = state.get("reviewed_content", {})
+            state["content_stage"] = "final"
             logger.info(f"✅ 文案已通过审核，质量评分: {quality_score:.1f}")
         else:
             state["approval_status"] = "rejected"
-            state["issues"].append(f"质量评分不足: {quality_score:.1f}/100")
+            add_issue(state, f"质量评分不足: {quality_score:.1f}/100")
             state["debate_rounds"] = state.get("debate_rounds", 0) + 1
             logger.warning(f"⚠️ 文案需要改进，质量评分: {quality_score:.1f}")
 
@@ -59,67 +121,107 @@ def chief_editor_node(state: AgentState) -> AgentState:
     return state
 
 
+async def fetch_one_node(payload: Dict) -> Dict:
+    """
+    单模块数据抓取（由 Send 并行分发）
+
+    Args:
+        payload: {"module": 模块名, "report_period": 报告周期}
+
+    Returns:
+        {"raw_data": {module: data}}，通过 merge_dicts reducer 合并到全局状态
+    """
+    module = payload["module"]
+    cache_path = _raw_data_cache_path(module, payload["report_period"])
+
+    cached = _load_raw_data_cache(cache_path)
+    if cached is not None:
+        logger.info(f"✅ {module} 原始数据缓存命中: {cache_path}")
+        return {"raw_data": {module: cached}}
+
+    logger.info(f"正在获取 {module} 模块数据...")
+
+    try:
+        data = await asyncio.to_thread(fetch_module_data, module, {})
+        _save_raw_data_cache(cache_path, data)
+        return {"raw_data": {module: data}}
+    except Exception as e:
+        # 失败的模块不写入 raw_data，由 data_engineer 汇总时记录问题
+        logger.error(f"❌ {module} 数据获取失败: {e}")
+        return {}
+
+
 def data_engineer_node(state: AgentState) -> AgentState:
     """
     数据工程师 Agent
-    职责：数据抓取、数据清洗、数据验证
+    职责：汇总并行抓取结果、数据验证
     """
     logger.info("📊 Data Engineer 开始工作...")
 
-    try:
-        # 获取所有模块数据
-        modules = ["macro", "btc"]  # 添加 BTC 模块
+    raw_data = state.get("raw_data", {})
 
-        raw_data = {}
-        for module in modules:
-            logger.info(f"正在获取 {module} 模块数据...")
-            data = fetch_module_data(module, {})
-            raw_data[module] = data
+    for module in MODULES:
+        if module not in raw_data:
+            error_msg = f"数据获取失败: {module}"
+            state["errors"].append(error_msg)
+            add_issue(state, error_msg)
+            logger.error(f"❌ {error_msg}")
 
-        state["raw_data"] = raw_data
-        state["current_step"] = "chart_generation"
+    state["current_step"] = "chart_generation"
+    logger.info(f"✅ 数据获取完成，共 {len(raw_data)} 个模块")
 
-        logger.info(f"✅ 数据获取完成，共 {len(raw_data)} 个模块")
+    return state
 
-    except Exception as e:
-        error_msg = f"数据获取失败: {str(e)}"
-        state["errors"].append(error_msg)
-        state["issues"].append(error_msg)
-        logger.error(f"❌ {error_msg}")
 
-    return state
+def chart_one_node(payload: Dict) -> Dict:
+    """
+    单模块图表生成（由 Send 并行分发）
+
+    Args:
+        payload: {"module": 模块名, "data": 模块数据}
+
+    Returns:
+        {"chart_paths": {module: [...]}}，通过 merge_dicts reducer 合并到全局状态
+    """
+    module = payload["module"]
+    logger.info(f"正在生成 {module} 模块图表...")
+
+    try:
+        # 按需导入: 到达图表阶段才加载 Matplotlib
+        from modules.chart_builder import generate_module_charts
+
+        charts = generate_module_charts(module, payload["data"])
+        logger.info(f"✅ {module} 生成了 {len(charts)} 张图表")
+        return {"chart_paths": {module: charts}}
+    except Exception as e:
+        # 失败的模块不写入 chart_paths，由 chartist 汇总时记录问题
+        logger.error(f"❌ {module} 图表生成失败: {e}")
+        return {}
 
 
 def chartist_node(state: AgentState) -> AgentState:
     """
     图表师 Agent
-    职责：图表生成、图表优化、视觉呈现
+    职责：汇总并行生成的图表
     """
     logger.info("📈 Chartist 开始工作...")
 
-    try:
-        raw_data = state.get("raw_data", {})
-        chart_paths = {}
-
-        for module, data in raw_data.items():
-            logger.info(f"正在生成 {module} 模块图表...")
-            charts = generate_module_charts(module, data)
-            chart_paths[module] = charts
-            logger.info(f"✅ {module} 生成了 {len(charts)} 张图表")
+    chart_paths = state.get("chart_paths", {})
 
-        state["chart_paths"] = chart_paths
-        state["current_step"] = "content_generation"
+    for module in state.get("raw_data", {}):
+        if module not in chart_paths:
+            error_msg = f"图表生成失败: {module}"
+            state["errors"].append(error_msg)
+            add_issue(state, error_msg)
+            logger.error(f"❌ {error_msg}")
 
-    except Exception as e:
-        error_msg = f"图表生成失败: {str(e)}"
-        state["errors"].append(error_msg)
-        state["issues"].append(error_msg)
-        logger.error(f"❌ {error_msg}")
+    state["chart_count"] = sum(map(len, chart_paths.values()))
+    state["current_step"] = "content_generation"
 
     return state
 
 
-def senior_analyst_node(state: AgentState) -> AgentState:
+async def senior_analyst_node(state: AgentState) -> AgentState:
     """
     资深分析师 Agent
     职责：LLM 文案生成、数据解读、专业分析
@@ -128,10 +230,6 @@ def senior_analyst_node(state: AgentState) -> AgentState:
 
     try:
         # 检查是否有 LLM API key（优先使用 OpenRouter/OpenAI）
-        import os
-        from pathlib import Path
-        from dotenv import load_dotenv
-
         # 强制重新加载环境变量
         env_path = Path(__file__).parent.parent / ".env"
         load_dotenv(dotenv_path=env_path, override=True)
@@ -141,10 +239,10 @@ def senior_analyst_node(state: AgentState) -> AgentState:
 
         if not (has_openai or has_gemini):
             logger.warning("⚠️ 未配置 LLM API Key，使用 Mock 文案")
-            state["draft_content"] = {
+            state["content"] = {
                 "macro_analysis": "宏观分析文案（Mock）- 请配置 OPENAI_API_KEY 或 GEMINI_API_KEY 以使用真实 LLM 生成"
             }
-            state["reviewed_content"] = state["draft_content"]
+            state["content_stage"] = "reviewed"
             state["current_step"] = "review"
             return state
 
@@ -152,12 +250,12 @@ def senior_analyst_node(state: AgentState) -> AgentState:
         model = "gpt-4o" if has_openai else "gemini-flash"
         writer = LLMWriter(model=model)
 
-        # 初始化 RAG Manager
+        # 初始化 RAG Manager（加载向量库是阻塞操作，放到线程中执行）
         from modules.rag_manager import RAGManager
 
         rag = None
         try:
-            rag = RAGManager()
+            rag = await asyncio.to_thread(RAGManager)
             logger.info("✅ RAG Manager 已加载")
         except Exception as e:
             logger.warning(f"⚠️  RAG Manager 加载失败,将不使用历史参考: {e}")
@@ -167,57 +265,66 @@ def senior_analyst_node(state: AgentState) -> AgentState:
         macro_data = raw_data.get("macro", {})
         btc_data = raw_data.get("btc", {})
 
-        draft_content = {}
+        # 记录本轮输入数据的版本，辩论轮次中数据不变时上下文直接命中缓存
+        version = data_fingerprint(macro_data, btc_data)
+        state["context_version"] = version
+        contexts = {}
 
-        # 生成宏观分析
         if macro_data:
-            macro_context = prepare_macro_context(macro_data)
-
-            # 检索历史参考
-            if rag:
-                try:
-                    rag_context = rag.retrieve_context("macro_analysis", macro_context)
-                    macro_context.update(rag_context)  # 添加 style_guide 和 reasoning_examples
-                except Exception as e:
-                    logger.warning(f"RAG 检索失败: {e}")
-
-            content = writer.generate("macro_analysis", macro_context)
-            draft_content["macro_analysis"] = content
-            logger.info("✅ 宏观分析文案生成完成")
+            contexts["macro_analysis"] = memoized_context(prepare_macro_context, macro_data, version=version)
         else:
-            state["issues"].append("缺少宏观数据")
+            add_issue(state, "缺少宏观数据")
 
-        # 生成 BTC 分析
         if btc_data:
-            btc_context = prepare_btc_context(btc_data, macro_data)
+            contexts["btc_analysis"] = memoized_context(prepare_btc_context, btc_data, macro_data, version=version)
+        else:
+            add_issue(state, "缺少 BTC 数据")
 
+        async def generate_section(prompt_type: str, context: Dict) -> str:
             # 检索历史参考
             if rag:
                 try:
-                    rag_context = rag.retrieve_context("btc_analysis", btc_context)
-                    btc_context.update(rag_context)  # 添加 style_guide 和 reasoning_examples
+                    rag_context = await asyncio.to_thread(rag.retrieve_context, prompt_type, context)
+                    context.update(rag_context)  # 添加 style_guide 和 reasoning_examples
                 except Exception as e:
                     logger.warning(f"RAG 检索失败: {e}")
 
-            content = writer.generate("btc_analysis", btc_context)
-            draft_content["btc_analysis"] = content
-            logger.info("✅ BTC 分析文案生成完成")
-        else:
-            state["issues"].append("缺少 BTC 数据")
+            return await writer.agenerate(prompt_type, context)
+
+        # 各部分文案并发生成
+        try:
+            results = await asyncio.gather(
+                *(generate_section(t, c) for t, c in contexts.items()),
+                return_exceptions=True
+            )
+        finally:
+            # writer 每轮新建，其异步客户端不会再被复用，在事件循环结束前释放连接池
+            await writer._aclose_async_client()
+
+        draft_content = {}
+        for prompt_type, result in zip(contexts, results):
+            if isinstance(result, Exception):
+                error_msg = f"文案生成失败 ({prompt_type}): {str(result)}"
+                state["errors"].append(error_msg)
+                add_issue(state, error_msg)
+                logger.error(f"❌ {error_msg}")
+            else:
+                draft_content[prompt_type] = result
+                logger.info(f"✅ {prompt_type} 文案生成完成")
 
         if draft_content:
-            state["draft_content"] = draft_content
-            state["reviewed_content"] = state["draft_content"]
+            state["content"] = draft_content
+            state["content_stage"] = "reviewed"
             logger.info(f"✅ LLM 文案生成完成，共 {len(draft_content)} 个部分")
         else:
-            state["issues"].append("无法生成任何文案")
+            add_issue(state, "无法生成任何文案")
 
         state["current_step"] = "review"
 
     except Exception as e:
         error_msg = f"文案生成失败: {str(e)}"
         state["errors"].append(error_msg)
-        state["issues"].append(error_msg)
+        add_issue(state, error_msg)
         logger.error(f"❌ {error_msg}")
 
     return state
@@ -257,7 +364,7 @@ def debate_node(state: AgentState) -> AgentState:
         })
 
         # 清空问题列表，准备下一轮审核
-        state["issues"] = []
+        clear_issues(state)
         state["debate_rounds"] = debate_rounds + 1
         state["current_step"] = "review"
 
@@ -266,12 +373,12 @@ def debate_node(state: AgentState) -> AgentState:
 
 # ==================== 路由函数 ====================
 
-def route_after_chief_editor(state: AgentState) -> str:
+def route_after_chief_editor(state: AgentState) -> Union[str, List[Send]]:
     """决定 Chief Editor 之后的路由"""
     current_step = state.get("current_step", "")
 
     if current_step == "data_collection":
-        return "data_engineer"
+        return fanout_fetch(state)
     elif current_step == "finalization":
         if state.get("consensus_reached", False):
             return "end"
@@ -281,6 +388,26 @@ def route_after_chief_editor(state: AgentState) -> str:
         return "end"
 
 
+def fanout_fetch(state: AgentState) -> List[Send]:
+    """为每个模块分发一个并行的数据抓取任务"""
+    return [
+        Send("fetch_one", {"module": module, "report_period": state["report_period"]})
+        for module in MODULES
+    ]
+
+
+def fanout_charts(state: AgentState) -> Union[str, List[Send]]:
+    """为每个已获取数据的模块分发一个并行的图表生成任务"""
+    raw_data = state.get("raw_data", {})
+    if not raw_data:
+        return "chartist"
+
+    return [
+        Send("chart_one", {"module": module, "data": data})
+        for module, data in raw_data.items()
+    ]
+
+
 def route_after_debate(state: AgentState) -> str:
     """决定 Debate 之后的路由"""
     if state.get("consensus_reached", False):
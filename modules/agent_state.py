@@ -4,9 +4,68 @@ LangGraph Multi-Agent 状态管理
 定义工作流的状态结构和转换逻辑
 """
 
-from typing import TypedDict, List, Dict, Optional, Annotated
+from typing import TypedDict, List, Dict, Optional, Annotated, Literal
 from datetime import datetime
-import operator
+import os
+import logging
+from modules.utils import json_dumps
+
+logger = logging.getLogger(__name__)
+
+# 状态中最多保留的消息条数，更早的消息溢出写入旁路文件
+MESSAGE_CAP = 50
+MESSAGES_OVERFLOW_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(__file__)), "output", "agent_messages_overflow.jsonl"
+)
+
+
+def merge_dicts(left: Dict, right: Dict) -> Dict:
+    """
+    字典合并 reducer
+
+    并行分支各自写入不同的 key（如 {"btc": ...} 与 {"macro": ...}），
+    合并后得到完整结果；重复写入相同内容是幂等的
+    """
+    if not right:
+        return left
+    merged = dict(left or {})
+    merged.update(right)
+    return merged
+
+
+def append_capped(left: List[Dict], right: List[Dict]) -> List[Dict]:
+    """
+    消息列表 reducer：追加新消息，只保留最近 MESSAGE_CAP 条
+
+    节点会原地 append 后返回整个 state，此时 right 就是（或以）left（开头），
+    只把新增部分视为增量，避免 operator.add 每步把历史整体复制一遍
+    """
+    left = left or []
+    if not right:
+        return left
+
+    if right is left:
+        combined = left
+    elif len(right) >= len(left) and right[:len(left)] == left:
+        combined = list(right)
+    else:
+        combined = left + right
+
+    if len(combined) > MESSAGE_CAP:
+        _spill_messages(combined[:-MESSAGE_CAP])
+        combined = combined[-MESSAGE_CAP:]
+
+    return combined
+
+
+def _spill_messages(messages: List[Dict]):
+    """把被截断的旧消息追加写入旁路文件 (JSONL)"""
+    try:
+        os.makedirs(os.path.dirname(MESSAGES_OVERFLOW_PATH), exist_ok=True)
+        with open(MESSAGES_OVERFLOW_PATH, "ab") as f:
+            f.write(b"".join(json_dumps(message) + b"\n" for message in messages))
+    except OSError as e:
+        logger.warning(f"写入溢出消息失败: {e}")
 
 
 class AgentState(TypedDict):
@@ -23,25 +82,27 @@ class AgentState(TypedDict):
     current_step: str  # 当前步骤
 
     # ========== 数据层 ==========
-    raw_data: Dict[str, Dict]  # 原始数据 {"btc": {...}, "macro": {...}}
+    raw_data: Annotated[Dict[str, Dict], merge_dicts]  # 原始数据 {"btc": {...}, "macro": {...}} (并行分支合并)
     processed_data: Dict[str, any]  # 处理后的数据
+    context_version: str  # 生成文案所用原始数据的内容哈希
 
     # ========== 图表层 ==========
-    chart_paths: Dict[str, List[str]]  # 生成的图表路径 {"btc": [...], "macro": [...]}
+    chart_paths: Annotated[Dict[str, List[str]], merge_dicts]  # 生成的图表路径 {"btc": [...], "macro": [...]} (并行分支合并)
+    chart_count: int  # 图表总数 (图表生成后计算一次)
 
     # ========== 文案层 ==========
-    draft_content: Dict[str, str]  # 初稿文案 {"btc_analysis": "...", ...}
-    reviewed_content: Dict[str, str]  # 审核后的文案
-    final_content: Dict[str, str]  # 最终文案
+    content: Dict[str, str]  # 文案 {"btc_analysis": "...", ...}
+    content_stage: Literal["", "draft", "reviewed", "final"]  # 文案所处阶段 (初稿/审核后/最终)
 
     # ========== Agent 协作 ==========
-    messages: Annotated[List[Dict], operator.add]  # Agent 之间的消息 (append-only)
+    messages: Annotated[List[Dict], append_capped]  # Agent 之间的消息 (append-only, 最多保留 MESSAGE_CAP 条)
     debate_rounds: int  # 辩论轮数
     consensus_reached: bool  # 是否达成共识
 
     # ========== 质量控制 ==========
     quality_score: float  # 质量评分 (0-100)
-    issues: List[str]  # 发现的问题列表
+    issues: List[str]  # 发现的问题列表 (通过 add_issue 追加)
+    critical_issue_count: int  # issues 中严重问题 (critical/error) 的数量
     approval_status: str  # 审批状态 ("pending", "approved", "rejected")
 
     # ========== 输出 ==========
@@ -76,21 +137,43 @@ def create_initial_state(report_period: str) -> AgentState:
         current_step="initialization",
         raw_data={},
         processed_data={},
+        context_version="",
         chart_paths={},
-        draft_content={},
-        reviewed_content={},
-        final_content={},
+        chart_count=0,
+        content={},
+        content_stage="",
         messages=[],
         debate_rounds=0,
         consensus_reached=False,
         quality_score=0.0,
         issues=[],
+        critical_issue_count=0,
         approval_status="pending",
         pdf_path=None,
         errors=[]
     )
 
 
+CONTENT_STAGES = ("draft", "reviewed", "final")
+
+
+def get_content(state: AgentState, stage: str = "final") -> Dict[str, str]:
+    """
+    按阶段读取文案
+
+    Args:
+        state: 当前状态
+        stage: 需要达到的阶段 ("draft", "reviewed", "final")
+
+    Returns:
+        文案已达到该阶段时返回文案，否则返回空字典
+    """
+    current = state.get("content_stage")
+    if current in CONTENT_STAGES and CONTENT_STAGES.index(current) >= CONTENT_STAGES.index(stage):
+        return state.get("content") or {}
+    return {}
+
+
 def add_message(
     state: AgentState,
     from_agent: str,
@@ -122,10 +205,30 @@ def add_message(
         metadata=metadata or {}
     )
 
-    # messages 字段使用 operator.add，会自动 append
+    # messages 字段使用 append_capped reducer，会自动 append
     return message
 
 
+def add_issue(state: AgentState, text: str):
+    """
+    追加问题并维护严重问题计数
+
+    Args:
+        state: 当前状态
+        text: 问题描述
+    """
+    state["issues"].append(text)
+    lowered = text.lower()
+    if "critical" in lowered or "error" in lowered:
+        state["critical_issue_count"] = state.get("critical_issue_count", 0) + 1
+
+
+def clear_issues(state: AgentState):
+    """清空问题列表及严重问题计数"""
+    state["issues"] = []
+    state["critical_issue_count"] = 0
+
+
 def should_continue_debate(state: AgentState, max_rounds: int = 2) -> bool:
     """
     判断是否应该继续辩论
@@ -146,12 +249,7 @@ def should_continue_debate(state: AgentState, max_rounds: int = 2) -> bool:
         return False
 
     # 如果有严重问题且未解决，继续
-    critical_issues = [
-        issue for issue in state.get("issues", [])
-        if "critical" in issue.lower() or "error" in issue.lower()
-    ]
-
-    return len(critical_issues) > 0
+    return state.get("critical_issue_count", 0) > 0
 
 
 def calculate_quality_score(state: AgentState) -> float:
@@ -164,39 +262,40 @@ def calculate_quality_score(state: AgentState) -> float:
     Returns:
         质量评分 (0-100)
     """
-    score = 100.0
+    penalty = 0
 
     # 数据完整性检查 (-20)
-    if not state.get("raw_data"):
-        score -= 20
-    elif len(state.get("raw_data", {})) < 2:
-        score -= 10
+    raw_data = state.get("raw_data")
+    if not raw_data:
+        penalty += 20
+    elif len(raw_data) < 2:
+        penalty += 10
 
     # 图表生成检查 (-20)
     if not state.get("chart_paths"):
-        score -= 20
-    elif sum(len(charts) for charts in state.get("chart_paths", {}).values()) < 2:
-        score -= 10
+        penalty += 20
+    elif state.get("chart_count", 0) < 2:
+        penalty += 10
 
     # 文案质量检查 (-30)
-    final_content = state.get("final_content", {})
+    final_content = get_content(state, "final")
     if not final_content:
-        score -= 30
+        penalty += 30
     else:
         # 检查文案长度（太短说明不够详细）
-        avg_length = sum(len(text) for text in final_content.values()) / max(len(final_content), 1)
+        avg_length = sum(map(len, final_content.values())) / len(final_content)
         if avg_length < 100:
-            score -= 20
+            penalty += 20
         elif avg_length < 200:
-            score -= 10
+            penalty += 10
 
     # 问题数量检查 (-30)
-    num_issues = len(state.get("issues", []))
+    num_issues = len(state.get("issues") or ())
     if num_issues > 5:
-        score -= 30
+        penalty += 30
     elif num_issues > 2:
-        score -= 15
+        penalty += 15
     elif num_issues > 0:
-        score -= 5
+        penalty += 5
 
-    return max(0.0, score)
+    return max(0.0, 100.0 - penalty)
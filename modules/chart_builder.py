@@ -3,12 +3,22 @@
 """
 
 import os
-from datetime import datetime
-from typing import Dict, List, Optional
+import atexit
+import multiprocessing
+import threading
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import numpy as np
 import matplotlib
 matplotlib.use('Agg')  # 非交互式后端
 import matplotlib.pyplot as plt
 import matplotlib.image as mpimg
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from .utils import logger
 
 # 项目根目录
@@ -25,9 +35,32 @@ else:
 # Logo 路径
 LOGO_PATH = os.path.join(PROJECT_ROOT, "assets/logo.png")
 
+
+def _load_logo(logo_path: str):
+    """解码 Logo 图片, 文件不存在或解码失败时返回 None"""
+    if not os.path.exists(logo_path):
+        return None
+    try:
+        return mpimg.imread(logo_path)
+    except Exception as e:
+        logger.warning(f"Logo 解码失败: {e}")
+        return None
+
+
+# 默认 Logo 在模块加载时解码一次, 所有图表复用
+_LOGO_ARR = _load_logo(LOGO_PATH)
+if _LOGO_ARR is None:
+    logger.warning(f"Logo 不可用: {LOGO_PATH}, 图表将不添加水印")
+
 # 输出目录
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output/images")
 
+# 默认输出分辨率, 150 dpi 在 A4 PDF / 网页中已足够清晰, 可通过 RF_CHART_DPI 覆盖
+CHART_DPI = int(os.getenv("RF_CHART_DPI", "150"))
+
+# PNG zlib 压缩级别: 图表大面积纯色, 低级别压缩文件只略大但编码快得多
+PNG_COMPRESS_LEVEL = int(os.getenv("RF_PNG_COMPRESS_LEVEL", "3"))
+
 
 def add_watermark(fig, logo_path: str = LOGO_PATH, alpha: float = 0.15):
     """
@@ -38,12 +71,18 @@ def add_watermark(fig, logo_path: str = LOGO_PATH, alpha: float = 0.15):
         logo_path: Logo 文件路径
         alpha: 透明度 (0-1)
     """
-    if not os.path.exists(logo_path):
-        logger.warning(f"Logo 文件不存在: {logo_path}, 跳过水印")
-        return
+    if logo_path == LOGO_PATH:
+        # 默认 Logo 缺失已在模块加载时提示过一次
+        logo = _LOGO_ARR
+        if logo is None:
+            return
+    else:
+        logo = _load_logo(logo_path)
+        if logo is None:
+            logger.warning(f"Logo 不可用: {logo_path}, 跳过水印")
+            return
 
     try:
-        logo = mpimg.imread(logo_path)
         # 在右下角添加 Logo
         ax_logo = fig.add_axes([0.80, 0.02, 0.15, 0.15], anchor='SE', zorder=1)
         ax_logo.imshow(logo, alpha=alpha)
@@ -53,31 +92,102 @@ def add_watermark(fig, logo_path: str = LOGO_PATH, alpha: float = 0.15):
         logger.warning(f"添加水印失败: {e}")
 
 
-def save_chart(fig, filename: str, dpi: int = 300) -> str:
+# 每个线程按 figsize 缓存一个 Figure, 渲染完 clf() 后复用
+_FIG_POOL = threading.local()
+
+
+def _get_figure(figsize: Tuple[float, float]) -> Figure:
+    """
+    获取当前线程可复用的空白 Figure
+
+    直接构建 Figure + Agg 画布 (不注册到 pyplot), 同一线程内按 figsize 复用,
+    避免每张图表重复创建 Figure/Canvas; 线程之间互不共享
+
+    Args:
+        figsize: 图表尺寸 (英寸)
+
+    Returns:
+        已清空的 Figure
+    """
+    pool = getattr(_FIG_POOL, "figures", None)
+    if pool is None:
+        pool = _FIG_POOL.figures = {}
+
+    fig = pool.get(figsize)
+    if fig is None:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        pool[figsize] = fig
+    else:
+        # 上一次渲染中途出错时 Figure 可能未被清空
+        fig.clf()
+    return fig
+
+
+@lru_cache(maxsize=None)
+def _date_dir(day: str) -> str:
+    """返回当日输出目录, 同一进程内每天只执行一次 makedirs"""
+    date_dir = os.path.join(OUTPUT_DIR, day)
+    os.makedirs(date_dir, exist_ok=True)
+    return date_dir
+
+
+def save_chart(fig, filename: str, dpi: Optional[int] = None) -> str:
     """
-    保存图表为高清 PNG
+    保存图表为 PNG
 
     Args:
         fig: Matplotlib Figure 对象
         filename: 文件名
-        dpi: 分辨率
+        dpi: 分辨率, 默认 CHART_DPI
 
     Returns:
         保存的文件路径
     """
-    # 按日期创建子目录
-    date_dir = os.path.join(OUTPUT_DIR, datetime.now().strftime('%Y-%m-%d'))
-    os.makedirs(date_dir, exist_ok=True)
+    # 按日期创建子目录 (每天只创建一次)
+    date_dir = _date_dir(date.today().isoformat())
 
     filepath = os.path.join(date_dir, filename)
 
-    fig.savefig(filepath, dpi=dpi, bbox_inches='tight', facecolor='white')
-    plt.close(fig)
+    # 保存前做一次 tight_layout, 代替 bbox_inches='tight' 在 savefig 时的二次布局
+    # (水印 axes 不参与布局, 忽略其兼容性警告)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        fig.tight_layout()
+    fig.savefig(
+        filepath, dpi=dpi or CHART_DPI, facecolor='white',
+        pil_kwargs={"compress_level": PNG_COMPRESS_LEVEL}
+    )
+    # 清空内容, Figure 本身留给下一张同尺寸图表复用
+    fig.clf()
 
     logger.info(f"图表已保存: {filepath}")
     return filepath
 
 
+def _rolling_means(values, windows: List[int]) -> Dict[int, np.ndarray]:
+    """
+    累积和法计算多条简单移动平均 (共用一次 cumsum), 前 window-1 个值为 NaN (与 pandas rolling 对齐)
+
+    Args:
+        values: 价格序列
+        windows: 窗口长度列表
+
+    Returns:
+        {窗口长度: 与输入等长的均线数组}
+    """
+    arr = np.asarray(values, dtype=np.float64)
+    c = np.cumsum(np.insert(arr, 0, 0.0))
+
+    means = {}
+    for window in windows:
+        out = np.full(arr.shape, np.nan)
+        if 0 < window <= len(arr):
+            out[window - 1:] = (c[window:] - c[:-window]) / window
+        means[window] = out
+    return means
+
+
 # ============= 图表生成函数 =============
 
 def generate_btc_price_chart(data: Dict, ma_periods: List[int] = [50, 200]) -> str:
@@ -91,20 +201,17 @@ def generate_btc_price_chart(data: Dict, ma_periods: List[int] = [50, 200]) -> s
     Returns:
         图表文件路径
     """
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = _get_figure((12, 7))
+    ax = fig.subplots()
 
     dates = data['dates']
-    prices = data['close']
+    prices = np.asarray(data['close'], dtype=np.float64)
 
     # 绘制价格曲线
     ax.plot(dates, prices, label='BTC Price', linewidth=2.5, color='#3498db')
 
     # 计算并绘制均线
-    import pandas as pd
-    df = pd.DataFrame({"price": prices})
-
-    for period in ma_periods:
-        ma = df['price'].rolling(window=period).mean()
+    for period, ma in _rolling_means(prices, ma_periods).items():
         ax.plot(dates, ma, label=f'MA{period}', linewidth=2, alpha=0.7)
 
     ax.set_xlabel('Date')
@@ -114,7 +221,7 @@ def generate_btc_price_chart(data: Dict, ma_periods: List[int] = [50, 200]) -> s
     ax.grid(True, alpha=0.3)
 
     # 旋转 x 轴标签
-    plt.xticks(rotation=45, ha='right')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
 
     # 添加水印
     add_watermark(fig)
@@ -132,24 +239,25 @@ def generate_urpd_chart(data: Dict) -> str:
     Returns:
         图表文件路径
     """
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = _get_figure((12, 7))
+    ax = fig.subplots()
 
     dates = data['dates'][-30:]  # 最近30天
-    values = data['values'][-30:]
+    values = np.asarray(data['values'][-30:], dtype=float)
 
     # 绘制柱状图
     bars = ax.bar(dates, values, color='#3498db', alpha=0.7, edgecolor='none')
 
-    # 高亮最高值
-    max_idx = values.index(max(values))
-    bars[max_idx].set_color('#e74c3c')
+    # 高亮最高值 (缺失值为 NaN, 全部缺失时不高亮)
+    if not np.isnan(values).all():
+        bars[int(np.nanargmax(values))].set_color('#e74c3c')
 
     ax.set_xlabel('Date')
     ax.set_ylabel('Supply Distribution')
     ax.set_title('Bitcoin URPD - Unrealized Profit/Loss Distribution')
     ax.grid(True, alpha=0.3, axis='y')
 
-    plt.xticks(rotation=45, ha='right')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
 
     # 添加水印
     add_watermark(fig)
@@ -167,13 +275,15 @@ def generate_etf_flow_chart(data: Dict) -> str:
     Returns:
         图表文件路径
     """
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = _get_figure((12, 7))
+    ax = fig.subplots()
 
     dates = data['dates'][-30:]
     values = data['values'][-30:]
 
     # 根据正负值使用不同颜色
-    colors = ['#2ecc71' if v > 0 else '#e74c3c' for v in values]
+    values = np.asarray(values, dtype=float)
+    colors = np.where(values > 0, '#2ecc71', '#e74c3c')
 
     ax.bar(dates, values, color=colors, alpha=0.7, edgecolor='none')
 
@@ -183,7 +293,7 @@ def generate_etf_flow_chart(data: Dict) -> str:
     ax.axhline(y=0, color='black', linestyle='-', linewidth=1)
     ax.grid(True, alpha=0.3, axis='y')
 
-    plt.xticks(rotation=45, ha='right')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
 
     add_watermark(fig)
 
@@ -204,9 +314,8 @@ def generate_crypto_stocks_chart(data: Dict) -> str:
     Returns:
         图表文件路径
     """
-    import pandas as pd
-
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = _get_figure((12, 7))
+    ax = fig.subplots()
 
     # 标准化价格 (以第一天为基准 = 100)
     stocks = ['nvda', 'coin', 'mstr']
@@ -219,7 +328,8 @@ def generate_crypto_stocks_chart(data: Dict) -> str:
             prices = data[stock]['close']
 
             # 标准化为百分比变化 (第一天 = 100)
-            normalized = [(p / prices[0]) * 100 for p in prices]
+            prices = np.asarray(prices, dtype=float)
+            normalized = prices / prices[0] * 100
 
             ax.plot(dates, normalized, label=label, linewidth=2.5, color=color)
 
@@ -230,7 +340,7 @@ def generate_crypto_stocks_chart(data: Dict) -> str:
     ax.legend(loc='best')
     ax.grid(True, alpha=0.3)
 
-    plt.xticks(rotation=45, ha='right')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
 
     add_watermark(fig)
 
@@ -252,7 +362,8 @@ def generate_macro_overview_chart(data: Dict) -> str:
     Returns:
         图表文件路径
     """
-    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+    fig = _get_figure((14, 10))
+    axes = fig.subplots(2, 2)
     fig.suptitle('Macro Overview: Key Indicators', fontsize=16, fontweight='bold')
 
     indicators = [
@@ -271,8 +382,7 @@ def generate_macro_overview_chart(data: Dict) -> str:
             ax.grid(True, alpha=0.3)
             ax.tick_params(axis='x', rotation=45)
 
-    plt.tight_layout()
-
+    # 布局由 save_chart 统一做一次 tight_layout
     add_watermark(fig)
 
     return save_chart(fig, 'macro_overview.png')
@@ -288,16 +398,16 @@ def generate_whale_cohort_heatmap(data: Dict) -> str:
     Returns:
         图表文件路径
     """
-    import pandas as pd
-
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = _get_figure((12, 7))
+    ax = fig.subplots()
 
     dates = data['dates']
     whale_balance = data['whale_balance']
 
-    # 计算变化率
-    df = pd.DataFrame({"balance": whale_balance})
-    change = df['balance'].pct_change() * 100  # 转换为百分比
+    # 计算变化率 (百分比)
+    b = np.asarray(whale_balance, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.diff(b) / b[:-1] * 100
 
     # 绘制面积图
     ax.fill_between(range(len(dates)), 0, whale_balance, alpha=0.6, color='#3498db', label='Whale Balance (1k-10k BTC)')
@@ -309,7 +419,7 @@ def generate_whale_cohort_heatmap(data: Dict) -> str:
     ax.legend(loc='best')
     ax.grid(True, alpha=0.3, axis='y')
 
-    plt.xticks(rotation=45, ha='right')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
 
     add_watermark(fig)
 
@@ -330,15 +440,16 @@ def generate_liquidation_heatmap(data: Dict) -> str:
     Returns:
         图表文件路径
     """
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = _get_figure((12, 7))
+    ax = fig.subplots()
 
-    dates = data['dates']
-    long_liq = data['long_liquidation']
-    short_liq = data['short_liquidation']
+    dates = np.asarray(data['dates'])
+    long_liq = np.asarray(data['long_liquidation'], dtype=float)
+    short_liq = np.asarray(data['short_liquidation'], dtype=float)
 
     # 堆叠柱状图
     width = 0.8
-    x = range(len(dates))
+    x = np.arange(len(dates))
 
     ax.bar(x, long_liq, width, label='Long Liquidation', color='#e74c3c', alpha=0.7)
     ax.bar(x, short_liq, width, bottom=long_liq, label='Short Liquidation', color='#2ecc71', alpha=0.7)
@@ -347,7 +458,7 @@ def generate_liquidation_heatmap(data: Dict) -> str:
     ax.set_ylabel('Liquidation Amount (USD)')
     ax.set_title('Bitcoin Liquidation Heatmap (Long vs Short)')
     ax.set_xticks(x[::2])  # 每隔一个显示日期标签
-    ax.set_xticklabels([dates[i] for i in x[::2]], rotation=45, ha='right')
+    ax.set_xticklabels(dates[::2], rotation=45, ha='right')
     ax.legend(loc='best')
     ax.grid(True, alpha=0.3, axis='y')
 
@@ -369,15 +480,16 @@ def generate_eth_btc_ratio_chart(data: Dict) -> str:
     Returns:
         图表文件路径
     """
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = _get_figure((12, 7))
+    ax = fig.subplots()
 
     # 计算 ETH/BTC 比率
-    import pandas as pd
-    eth_prices = pd.Series(data['eth']['close'])
-    btc_prices = pd.Series(data['btc']['close'])
-    ratio = eth_prices / btc_prices
+    eth_prices = np.asarray(data['eth']['close'], dtype=float)
+    btc_prices = np.asarray(data['btc']['close'], dtype=float)
+    n = min(len(eth_prices), len(btc_prices))
+    ratio = eth_prices[:n] / btc_prices[:n]
 
-    dates = data['eth']['dates']
+    dates = data['eth']['dates'][:n]
 
     ax.plot(dates, ratio, linewidth=2.5, color='#9b59b6')
     ax.set_xlabel('Date')
@@ -385,7 +497,7 @@ def generate_eth_btc_ratio_chart(data: Dict) -> str:
     ax.set_title('Ethereum vs Bitcoin Price Ratio')
     ax.grid(True, alpha=0.3)
 
-    plt.xticks(rotation=45, ha='right')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
 
     add_watermark(fig)
 
@@ -402,7 +514,8 @@ def generate_eth_foundation_balance(data: Dict) -> str:
     Returns:
         图表文件路径
     """
-    fig, ax = plt.subplots(figsize=(12, 7))
+    fig = _get_figure((12, 7))
+    ax = fig.subplots()
 
     dates = data.get('dates', [])
     balance = data.get('balance', [])
@@ -410,7 +523,6 @@ def generate_eth_foundation_balance(data: Dict) -> str:
     if not dates or not balance:
         # 如果没有数据,使用模拟数据
         logger.warning("以太坊基金会数据暂无,使用模拟数据")
-        from datetime import datetime, timedelta
         dates = [(datetime.now() - timedelta(days=i)).strftime('%Y-%m-%d') for i in range(30, 0, -1)]
         balance = [300000 - i*100 for i in range(30)]
 
@@ -422,7 +534,7 @@ def generate_eth_foundation_balance(data: Dict) -> str:
     ax.set_title('Ethereum Foundation Holdings')
     ax.grid(True, alpha=0.3)
 
-    plt.xticks(rotation=45, ha='right')
+    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
 
     add_watermark(fig)
 
@@ -431,63 +543,170 @@ def generate_eth_foundation_balance(data: Dict) -> str:
 
 # ============= 模块图表生成入口 =============
 
-def generate_module_charts(module_name: str, data: Dict) -> List[str]:
+def _has_stock_data(data: Dict) -> bool:
+    return 'nvda' in data or 'coin' in data
+
+
+# 模块 → [(数据选择器, 图表函数)]
+# 选择器: 字符串表示取 data[key] (key 不存在则跳过); None 表示传入整个模块数据;
+# 可调用对象表示条件成立时传入整个模块数据
+CHART_REGISTRY: Dict[str, List[Tuple[Union[str, None, Callable[[Dict], bool]], Callable[[Dict], str]]]] = {
+    "btc": [
+        ("price", generate_btc_price_chart),            # BTC 价格图
+        ("urpd", generate_urpd_chart),                  # URPD 筹码分布
+        ("etf_flow", generate_etf_flow_chart),          # ETF 资金流向
+        ("whale_cohort", generate_whale_cohort_heatmap),  # 鲸鱼分群
+        ("liquidation", generate_liquidation_heatmap),  # 清算热力图
+    ],
+    "macro": [
+        (None, generate_macro_overview_chart),          # 宏观总览图 (四合一)
+        (_has_stock_data, generate_crypto_stocks_chart),  # 加密相关股票对比
+    ],
+    "eth": [
+        ("eth_btc_ratio", generate_eth_btc_ratio_chart),        # ETH/BTC 汇率
+        ("foundation_balance", generate_eth_foundation_balance),  # 以太坊基金会持仓
+    ],
+}
+
+
+def chart_specs(module_name: str, data: Dict) -> List[Tuple[Callable[[Dict], str], Dict]]:
     """
-    根据模块名称生成对应的所有图表
+    根据模块名称列出需要生成的图表
 
     Args:
         module_name: 模块名称
         data: 模块数据
 
     Returns:
-        生成的图表文件路径列表
+        [(图表函数, 图表数据), ...]
     """
-    chart_paths = []
+    specs = []
+    for selector, fn in CHART_REGISTRY.get(module_name, ()):
+        if selector is None:
+            specs.append((fn, data))
+        elif isinstance(selector, str):
+            if selector in data:
+                specs.append((fn, data[selector]))
+        elif selector(data):
+            specs.append((fn, data))
+    return specs
+
+
+def _render_one(spec: Tuple[Callable[[Dict], str], Dict]) -> str:
+    """渲染单张图表 (进程池 worker 入口, 模块级函数按引用 pickle)"""
+    fn, chart_data = spec
+    return fn(chart_data)
+
 
+def _chart_workers() -> int:
+    """
+    图表渲染进程数, 可通过 RF_CHART_WORKERS 配置 (<=1 表示串行)
+
+    默认取 CPU 核数与注册图表总数中的较小值, 多出的 worker 永远不会被用到
+    """
+    max_charts = sum(len(entries) for entries in CHART_REGISTRY.values())
     try:
-        if module_name == "btc":
-            # BTC 价格图
-            if 'price' in data:
-                chart_paths.append(generate_btc_price_chart(data['price']))
+        return int(os.getenv("RF_CHART_WORKERS", min(os.cpu_count() or 1, max_charts)))
+    except ValueError:
+        return 1
 
-            # URPD 筹码分布
-            if 'urpd' in data:
-                chart_paths.append(generate_urpd_chart(data['urpd']))
 
-            # ETF 资金流向
-            if 'etf_flow' in data:
-                chart_paths.append(generate_etf_flow_chart(data['etf_flow']))
+_POOL: Optional[ProcessPoolExecutor] = None
+# 图表节点由 LangGraph 在多个线程中并发执行, 进程池的创建需加锁
+_POOL_LOCK = threading.Lock()
 
-            # 鲸鱼分群
-            if 'whale_cohort' in data:
-                chart_paths.append(generate_whale_cohort_heatmap(data['whale_cohort']))
 
-            # 清算热力图
-            if 'liquidation' in data:
-                chart_paths.append(generate_liquidation_heatmap(data['liquidation']))
+def _pool_context():
+    """
+    worker 启动方式: 优先 forkserver, 其次 spawn
 
-        elif module_name == "macro":
-            # 宏观总览图 (四合一)
-            chart_paths.append(generate_macro_overview_chart(data))
+    调用方进程已有多个线程 (LangGraph 执行器、Streamlit、日志监听), 直接 fork 可能继承被持有的锁
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
 
-            # 加密相关股票对比
-            if 'nvda' in data or 'coin' in data:
-                chart_paths.append(generate_crypto_stocks_chart(data))
 
-        elif module_name == "eth":
-            # ETH/BTC 汇率
-            if 'eth_btc_ratio' in data:
-                chart_paths.append(generate_eth_btc_ratio_chart(data['eth_btc_ratio']))
+def _init_chart_worker():
+    """
+    worker 初始化: 导入本模块时已设置 Agg 后端、加载样式和 Logo;
+    再渲染一张空白图预热字体缓存, 首个任务不再承担这部分开销
+    """
+    fig = Figure()
+    fig.suptitle("warmup")
+    FigureCanvasAgg(fig).draw()
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """懒加载共享进程池, 跨模块/跨调用复用, 避免每次重复启动 worker 和导入 matplotlib"""
+    global _POOL
+    workers = _chart_workers()
+    if workers <= 1:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(
+                max_workers=workers, mp_context=_pool_context(), initializer=_init_chart_worker
+            )
+            atexit.register(_POOL.shutdown, wait=False)
+        return _POOL
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """丢弃已损坏的进程池 (其他线程可能已换上新的进程池, 此时保留新的)"""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is pool:
+            _POOL = None
+    pool.shutdown(wait=False)
+
+
+def _render_serial(specs: List[Tuple[Callable[[Dict], str], Dict]], module_name: str) -> List[str]:
+    chart_paths = []
+    for spec in specs:
+        try:
+            chart_paths.append(_render_one(spec))
+        except Exception as e:
+            logger.error(f"生成 {module_name} 模块图表 {spec[0].__name__} 失败: {e}")
+    return chart_paths
 
-            # 以太坊基金会持仓
-            if 'foundation_balance' in data:
-                chart_paths.append(generate_eth_foundation_balance(data['foundation_balance']))
 
-        logger.info(f"成功生成 {module_name} 模块的 {len(chart_paths)} 张图表")
+def generate_module_charts(module_name: str, data: Dict) -> List[str]:
+    """
+    根据模块名称生成对应的所有图表
 
-    except Exception as e:
-        logger.error(f"生成 {module_name} 模块图表失败: {e}")
+    多张图表时分发到共享进程池并行渲染 (matplotlib 光栅化为 CPU 密集),
+    进程池不可用时退回串行渲染
 
+    Args:
+        module_name: 模块名称
+        data: 模块数据
+
+    Returns:
+        生成的图表文件路径列表 (顺序与 chart_specs 一致)
+    """
+    specs = chart_specs(module_name, data)
+
+    pool = _get_pool() if len(specs) > 1 else None
+    if pool is None:
+        chart_paths = _render_serial(specs, module_name)
+    else:
+        chart_paths = []
+        try:
+            futures = [pool.submit(_render_one, spec) for spec in specs]
+            for spec, future in zip(specs, futures):
+                try:
+                    chart_paths.append(future.result())
+                except BrokenProcessPool:
+                    raise
+                except Exception as e:
+                    logger.error(f"生成 {module_name} 模块图表 {spec[0].__name__} 失败: {e}")
+        except (BrokenProcessPool, RuntimeError) as e:
+            # 进程池已损坏 (如 worker 被杀) 或已关闭, 丢弃后串行兜底
+            logger.warning(f"图表进程池不可用, 改为串行渲染: {e}")
+            _discard_pool(pool)
+            chart_paths = _render_serial(specs, module_name)
+
+    logger.info(f"成功生成 {module_name} 模块的 {len(chart_paths)} 张图表")
     return chart_paths
 
 
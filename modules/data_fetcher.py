@@ -3,12 +3,17 @@
 """
 
 import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from functools import partial
 from typing import Dict, List, Optional
+import numpy as np
 import yfinance as yf
 import pandas as pd
 from dotenv import load_dotenv
-from .utils import cache_api_call, robust_api_call, logger
+from .utils import cache_api_call, robust_api_call, logger, YAHOO_HISTORY_DIR
 
 # 加载环境变量
 load_dotenv()
@@ -17,9 +22,45 @@ load_dotenv()
 GLASSNODE_API_KEY = os.getenv("GLASSNODE_API_KEY")
 COINGLASS_API_KEY = os.getenv("COINGLASS_API_KEY")
 
+# 宏观模块标的 {数据键: Yahoo 代码}
+MACRO_TICKERS = {
+    "dxy": "DX-Y.NYB",
+    "us10y": "^TNX",
+    "sp500": "^GSPC",
+    "nvda": "NVDA",
+    "coin": "COIN",
+    "mstr": "MSTR"  # MicroStrategy
+}
+
+# 各模块依赖的 Yahoo 标的 (多模块可合并为一次批量请求)
+MODULE_YAHOO_TICKERS = {
+    "macro": tuple(MACRO_TICKERS.values()),
+    "btc": ("BTC-USD",),
+    "eth": ("ETH-USD", "BTC-USD"),
+}
+
 
 # ============= Glassnode API =============
 
+def _parse_glassnode(data: List[Dict]):
+    """
+    一次遍历解析 Glassnode 响应 [{"t": 时间戳, "v": 数值}, ...]
+
+    Args:
+        data: Glassnode API 响应
+
+    Returns:
+        (时间戳列表, 日期字符串列表 (UTC), 数值列表 (缺失值为 NaN))
+    """
+    n = len(data)
+    ts = np.fromiter((item["t"] for item in data), dtype=np.int64, count=n)
+    values = np.fromiter(
+        (np.nan if item["v"] is None else item["v"] for item in data), dtype=np.float64, count=n
+    )
+    dates = np.datetime_as_string(ts.astype('datetime64[s]'), unit='D')
+    return ts.tolist(), dates.tolist(), values.tolist()
+
+
 @cache_api_call(cache_ttl_hours=12)
 def fetch_glassnode_urpd(asset: str = "BTC", days: int = 30) -> Dict:
     """
@@ -56,10 +97,11 @@ def fetch_glassnode_urpd(asset: str = "BTC", days: int = 30) -> Dict:
         data = robust_api_call(url, params=params)
 
         # 转换格式
+        timestamps, dates, values = _parse_glassnode(data)
         result = {
-            "timestamps": [item["t"] for item in data],
-            "dates": [datetime.fromtimestamp(item["t"]).strftime('%Y-%m-%d') for item in data],
-            "values": [item["v"] for item in data]
+            "timestamps": timestamps,
+            "dates": dates,
+            "values": values
         }
 
         logger.info(f"成功获取 {asset} URPD 数据, 共 {len(result['timestamps'])} 条记录")
@@ -103,9 +145,10 @@ def fetch_glassnode_etf_flow(asset: str = "BTC", days: int = 30) -> Dict:
     try:
         data = robust_api_call(url, params=params)
 
+        _, dates, values = _parse_glassnode(data)
         result = {
-            "dates": [datetime.fromtimestamp(item["t"]).strftime('%Y-%m-%d') for item in data],
-            "values": [item["v"] for item in data]
+            "dates": dates,
+            "values": values
         }
 
         logger.info(f"成功获取 {asset} ETF Flow 数据, 共 {len(result['dates'])} 条记录")
@@ -150,9 +193,10 @@ def fetch_glassnode_whale_cohort(asset: str = "BTC", days: int = 90) -> Dict:
     try:
         whale_data = robust_api_call(url_whale, params=params)
 
+        _, dates, whale_balance = _parse_glassnode(whale_data)
         result = {
-            "dates": [datetime.fromtimestamp(item["t"]).strftime('%Y-%m-%d') for item in whale_data],
-            "whale_balance": [item["v"] for item in whale_data]
+            "dates": dates,
+            "whale_balance": whale_balance
         }
 
         logger.info(f"成功获取 {asset} Whale Cohort 数据")
@@ -165,6 +209,42 @@ def fetch_glassnode_whale_cohort(asset: str = "BTC", days: int = 90) -> Dict:
 
 # ============= Yahoo Finance =============
 
+def _parse_yahoo_frame(data: pd.DataFrame) -> Dict:
+    """
+    将 yfinance 返回的单个标的 DataFrame 转换为标准字典
+
+    Args:
+        data: 包含 Close/Volume 列的 DataFrame
+
+    Returns:
+        {"dates": [...], "close": [...], "volume": [...]}
+    """
+    # 处理 yfinance 返回的数据格式
+    # 如果是 Series,直接转换;如果是 DataFrame,需要先取值
+    close_data = data['Close']
+    volume_data = data['Volume'] if 'Volume' in data.columns else []
+
+    # 转换为列表（处理 Series 和 DataFrame）
+    if hasattr(close_data, 'values'):
+        # DataFrame: values 是 2D 数组，需要展平
+        close_list = close_data.values.flatten().tolist()
+    else:
+        close_list = close_data.tolist()
+
+    if hasattr(volume_data, 'values'):
+        volume_list = volume_data.values.flatten().tolist()
+    elif hasattr(volume_data, 'tolist'):
+        volume_list = volume_data.tolist()
+    else:
+        volume_list = []
+
+    return {
+        "dates": data.index.strftime('%Y-%m-%d').tolist(),
+        "close": close_list,
+        "volume": volume_list
+    }
+
+
 @cache_api_call(cache_ttl_hours=12)
 def fetch_yahoo_data(ticker: str, days: int = 30) -> Dict:
     """
@@ -197,30 +277,7 @@ def fetch_yahoo_data(ticker: str, days: int = 30) -> Dict:
             logger.warning(f"未获取到 {ticker} 的数据")
             return {"dates": [], "close": [], "volume": []}
 
-        # 处理 yfinance 返回的数据格式
-        # 如果是 Series,直接转换;如果是 DataFrame,需要先取值
-        close_data = data['Close']
-        volume_data = data['Volume'] if 'Volume' in data.columns else []
-
-        # 转换为列表（处理 Series 和 DataFrame）
-        if hasattr(close_data, 'values'):
-            # DataFrame: values 是 2D 数组，需要展平
-            close_list = close_data.values.flatten().tolist()
-        else:
-            close_list = close_data.tolist()
-
-        if hasattr(volume_data, 'values'):
-            volume_list = volume_data.values.flatten().tolist()
-        elif hasattr(volume_data, 'tolist'):
-            volume_list = volume_data.tolist()
-        else:
-            volume_list = []
-
-        result = {
-            "dates": data.index.strftime('%Y-%m-%d').tolist(),
-            "close": close_list,
-            "volume": volume_list
-        }
+        result = _parse_yahoo_frame(data)
 
         logger.info(f"成功获取 {ticker} 数据, 共 {len(result['dates'])} 天")
         return result
@@ -230,6 +287,153 @@ def fetch_yahoo_data(ticker: str, days: int = 30) -> Dict:
         raise
 
 
+# 各标的日线历史的本地 parquet 缓存 (YAHOO_HISTORY_DIR), 再次运行时只补抓最新部分
+
+
+def _yahoo_history_path(ticker: str) -> str:
+    safe = re.sub(r'[^A-Za-z0-9_.-]', '_', ticker)
+    return os.path.join(YAHOO_HISTORY_DIR, f"yf_{safe}.parquet")
+
+
+def _load_yahoo_history(ticker: str) -> Optional[pd.DataFrame]:
+    """读取标的的本地历史, 不存在或读取失败返回 None"""
+    path = _yahoo_history_path(ticker)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        logger.warning(f"读取 Yahoo 历史缓存失败: {path}, 错误: {e}")
+        return None
+
+
+def _save_yahoo_history(ticker: str, frame: pd.DataFrame):
+    """保存标的的本地历史 (失败只记录警告)"""
+    path = _yahoo_history_path(ticker)
+    # 先写临时文件再原子替换, 其他会话/线程不会读到写了一半的文件
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(YAHOO_HISTORY_DIR, exist_ok=True)
+        frame.to_parquet(tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+    except Exception as e:
+        logger.warning(f"保存 Yahoo 历史缓存失败: {path}, 错误: {e}")
+
+
+def _ticker_rows(data: pd.DataFrame, ticker: str) -> Optional[pd.DataFrame]:
+    """从 yf.download(group_by='ticker') 的结果中取出单个标的的有效行, 无数据返回 None"""
+    if data.empty:
+        return None
+    grouped = isinstance(data.columns, pd.MultiIndex)
+    if grouped and ticker not in set(data.columns.get_level_values(0)):
+        return None
+    # 不同市场交易日不同, 去掉该标的无数据的行
+    rows = (data[ticker] if grouped else data).dropna(subset=['Close'])
+    return None if rows.empty else rows
+
+
+def _history_is_stale(cached: pd.DataFrame, fresh: pd.DataFrame) -> bool:
+    """
+    重叠交易日的缓存收盘价与重新下载的不一致, 说明 Yahoo 已追溯调整历史价格 (拆股/分红)
+
+    最后一个缓存交易日可能是盘中数据, 不参与比较
+    """
+    settled = cached.index[:-1].intersection(fresh.index)
+    if settled.empty:
+        return False
+    return not np.allclose(
+        cached.loc[settled, 'Close'].to_numpy(dtype=float),
+        fresh.loc[settled, 'Close'].to_numpy(dtype=float),
+        rtol=1e-6, equal_nan=True
+    )
+
+
+@cache_api_call(cache_ttl_hours=12)
+def fetch_yahoo_batch(tickers: tuple, days: int = 30) -> Dict[str, Dict]:
+    """
+    一次请求批量获取多个标的的 Yahoo Finance 数据
+
+    已有本地历史的标的只补抓最近的数据, 并多抓一个已收盘的缓存交易日用于校验:
+    其收盘价与缓存不一致 (拆股/分红后历史价格被追溯调整) 时, 该标的整个窗口重新下载
+
+    Args:
+        tickers: 标的代码元组, 如 ("DX-Y.NYB", "^TNX", "NVDA")
+        days: 回溯天数
+
+    Returns:
+        {ticker: {"dates": [...], "close": [...], "volume": [...]}, ...}
+    """
+    try:
+        end_date = datetime.now()
+        window_start = pd.Timestamp((end_date - timedelta(days=days)).date())
+        window_end = pd.Timestamp(end_date.date())
+
+        history = {ticker: _load_yahoo_history(ticker) for ticker in tickers}
+
+        def fetch_from(ticker: str) -> pd.Timestamp:
+            cached = history[ticker]
+            if cached is None or len(cached) < 2 or cached.index[0] > window_start:
+                return window_start
+            # 从倒数第二个缓存交易日开始: 最后一天可能是盘中数据需重新获取, 倒数第二天用于校验
+            return max(cached.index[-2], window_start)
+
+        def download(symbols: List[str], start: pd.Timestamp) -> pd.DataFrame:
+            # 单次 yf.download 拉取多个标的, 按 ticker 分组
+            return yf.download(
+                symbols,
+                start=start.strftime('%Y-%m-%d'),
+                end=window_end.strftime('%Y-%m-%d'),
+                group_by='ticker',
+                progress=False
+            )
+
+        data = download(list(tickers), min(fetch_from(ticker) for ticker in tickers))
+
+        frames = {}
+        stale = []
+        for ticker in tickers:
+            frame = history[ticker]
+            fresh = _ticker_rows(data, ticker)
+            if fresh is not None:
+                if frame is not None and _history_is_stale(frame, fresh):
+                    stale.append(ticker)
+                    continue
+                frame = fresh if frame is None else pd.concat([frame, fresh])
+                frame = frame[~frame.index.duplicated(keep='last')].sort_index()
+                _save_yahoo_history(ticker, frame)
+            frames[ticker] = frame
+
+        if stale:
+            logger.info(f"Yahoo 历史价格已调整 (拆股/分红), 重新下载完整窗口: {', '.join(stale)}")
+            full = download(stale, window_start)
+            for ticker in stale:
+                frame = _ticker_rows(full, ticker)
+                if frame is not None:
+                    frame = frame.sort_index()
+                    _save_yahoo_history(ticker, frame)
+                frames[ticker] = frame
+
+        results = {}
+        for ticker in tickers:
+            frame = frames[ticker]
+            if frame is not None:
+                frame = frame[(frame.index >= window_start) & (frame.index < window_end)]
+
+            if frame is None or frame.empty:
+                logger.warning(f"未获取到 {ticker} 的数据")
+                results[ticker] = {"dates": [], "close": [], "volume": []}
+                continue
+
+            results[ticker] = _parse_yahoo_frame(frame)
+
+        logger.info(f"成功批量获取 {len(tickers)} 个标的数据: {', '.join(tickers)}")
+        return results
+
+    except Exception as e:
+        logger.error(f"批量获取 Yahoo Finance 数据失败 ({tickers}): {e}")
+        raise
+
+
 # ============= Coinglass API (补充:清算数据等) =============
 
 @cache_api_call(cache_ttl_hours=12)
@@ -284,62 +488,67 @@ def fetch_coinglass_liquidation(symbol: str = "BTC", days: int = 7) -> Dict:
 
 # ============= 数据整合函数 =============
 
-def fetch_module_data(module_name: str, config: Dict) -> Dict:
+def fetch_module_data(module_name: str, config: Dict, yahoo: Optional[Dict[str, Dict]] = None) -> Dict:
     """
     根据模块名称获取对应的数据
 
     Args:
         module_name: 模块名称 ('macro', 'btc', 'eth', 'news')
         config: 配置参数 {date_range: (start, end), ...}
+        yahoo: 已批量获取的 Yahoo 数据 {ticker: {...}}, 为 None 时按模块单独请求
 
     Returns:
         模块数据字典
     """
     days = 30  # 默认30天
 
-    if module_name == "macro":
-        # 宏观模块:美元指数、美债、美股、加密相关股票
-        return {
-            "dxy": fetch_yahoo_data("DX-Y.NYB", days=days),
-            "us10y": fetch_yahoo_data("^TNX", days=days),
-            "sp500": fetch_yahoo_data("^GSPC", days=days),
-            "nvda": fetch_yahoo_data("NVDA", days=days),
-            "coin": fetch_yahoo_data("COIN", days=days),
-            "mstr": fetch_yahoo_data("MSTR", days=days)  # MicroStrategy
-        }
-
-    elif module_name == "btc":
-        # BTC 深度分析
-        result = {
-            "price": fetch_yahoo_data("BTC-USD", days=days),
-        }
+    if module_name == "btc":
+        # BTC 深度分析: 价格、链上数据、清算数据相互独立, 并发获取
+        tasks = {}
+        if yahoo is None:
+            tasks["price"] = partial(fetch_yahoo_batch, MODULE_YAHOO_TICKERS["btc"], days=days)
 
         # 尝试获取 Glassnode 数据（需要 API key）
         if GLASSNODE_API_KEY:
-            try:
-                result["urpd"] = fetch_glassnode_urpd("BTC", days=days)
-                result["etf_flow"] = fetch_glassnode_etf_flow("BTC", days=days)
-                result["whale_cohort"] = fetch_glassnode_whale_cohort("BTC", days=90)
-            except Exception as e:
-                logger.warning(f"获取 Glassnode 数据失败: {e}")
+            tasks["urpd"] = partial(fetch_glassnode_urpd, "BTC", days=days)
+            tasks["etf_flow"] = partial(fetch_glassnode_etf_flow, "BTC", days=days)
+            tasks["whale_cohort"] = partial(fetch_glassnode_whale_cohort, "BTC", days=90)
         else:
             logger.info("未配置 GLASSNODE_API_KEY，跳过链上数据")
 
         # 尝试获取 Coinglass 数据
-        try:
-            result["liquidation"] = fetch_coinglass_liquidation("BTC", days=7)
-        except Exception as e:
-            logger.warning(f"获取清算数据失败: {e}")
+        tasks["liquidation"] = partial(fetch_coinglass_liquidation, "BTC", days=7)
+
+        with ThreadPoolExecutor(max_workers=len(tasks)) as executor:
+            futures = {key: executor.submit(task) for key, task in tasks.items()}
+
+            # 价格是必需数据, 获取失败直接抛出
+            result = {
+                "price": (futures.pop("price").result() if yahoo is None else yahoo)["BTC-USD"],
+            }
+
+            for key, future in futures.items():
+                try:
+                    result[key] = future.result()
+                except Exception as e:
+                    logger.warning(f"获取 BTC {key} 数据失败: {e}")
 
         return result
 
+    if yahoo is None and module_name in MODULE_YAHOO_TICKERS:
+        yahoo = fetch_yahoo_batch(MODULE_YAHOO_TICKERS[module_name], days=days)
+
+    if module_name == "macro":
+        # 宏观模块:美元指数、美债、美股、加密相关股票
+        return {key: yahoo[ticker] for key, ticker in MACRO_TICKERS.items()}
+
     elif module_name == "eth":
         # ETH 分析
         return {
-            "price": fetch_yahoo_data("ETH-USD", days=days),
+            "price": yahoo["ETH-USD"],
             "eth_btc_ratio": {
-                "eth": fetch_yahoo_data("ETH-USD", days=days),
-                "btc": fetch_yahoo_data("BTC-USD", days=days)
+                "eth": yahoo["ETH-USD"],
+                "btc": yahoo["BTC-USD"]
             }
         }
 
@@ -354,6 +563,46 @@ def fetch_module_data(module_name: str, config: Dict) -> Dict:
         return {}
 
 
+def fetch_modules_batch(modules: List[str], config: Dict) -> Dict[str, Dict]:
+    """
+    批量获取多个模块的数据
+
+    所有模块依赖的 Yahoo 标的合并为一次 yf.download 请求, 其余数据源 (Glassnode/Coinglass)
+    按模块并发获取; 批量请求失败时退回各模块单独请求
+
+    Args:
+        modules: 模块名称列表
+        config: 配置参数
+
+    Returns:
+        {module: 模块数据}, 获取失败的模块不包含在结果中
+    """
+    results = {}
+    if not modules:
+        return results
+
+    tickers = tuple(dict.fromkeys(
+        ticker for module in modules for ticker in MODULE_YAHOO_TICKERS.get(module, ())
+    ))
+
+    yahoo = None
+    if tickers:
+        try:
+            yahoo = fetch_yahoo_batch(tickers, days=30)
+        except Exception as e:
+            logger.warning(f"批量获取 Yahoo 数据失败, 改为按模块获取: {e}")
+
+    with ThreadPoolExecutor(max_workers=len(modules)) as executor:
+        futures = {module: executor.submit(fetch_module_data, module, config, yahoo) for module in modules}
+        for module, future in futures.items():
+            try:
+                results[module] = future.result()
+            except Exception as e:
+                logger.error(f"获取 {module} 模块数据失败: {e}")
+
+    return results
+
+
 if __name__ == "__main__":
     # 测试代码
     print("测试 Yahoo Finance 数据获取:")
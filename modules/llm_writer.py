@@ -5,12 +5,20 @@ LLM 文案生成模块
 """
 
 import os
+import time
+import string
+import asyncio
+import threading
+import weakref
+import hashlib
 import logging
-from typing import Dict, List, Optional
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional
 from datetime import datetime
-import json
 from pathlib import Path
+import numpy as np
 from dotenv import load_dotenv
+from .utils import LLM_CACHE_DIR, json_dumps, json_loads, pct_change
 
 # 加载环境变量（从项目根目录）
 env_path = Path(__file__).parent.parent / ".env"
@@ -18,10 +26,32 @@ load_dotenv(dotenv_path=env_path)
 
 logger = logging.getLogger(__name__)
 
+# OpenAI 系统提示词
+SYSTEM_PROMPT = "你是一位专业的加密货币分析师，擅长撰写简洁、数据驱动的市场分析。"
+
 # Prompt 模板
+# 静态部分（角色、任务、写作要求）放在最前，动态数据放在末尾：
+# 各平台的 prompt 缓存只对逐字节相同的前缀生效，前缀稳定才能在多次调用/辩论轮次间命中缓存
 PROMPTS = {
     "btc_analysis": """你是一位专业的加密货币分析师，正在撰写 BTC 周报的市场分析部分。
 
+**任务：**
+1. **第一步 - 元认知分析**：
+   阅读下方的历史论证框架，总结它们分别用了哪些维度的论证（技术面/资金面/链上/衍生品），
+   以及如何组合这些维度形成完整结论。
+
+2. **第二步 - 应用框架**：
+   将上述论证框架应用到当前市场数据，生成 200-300 字的专业分析。
+
+**写作要求：**
+- ✅ 多维度交叉验证（技术 + 资金 + 链上/衍生品）
+- ✅ 数据驱动，明确指出关键价格位/指标
+- ✅ 自然过渡，避免"首先、其次、最后"
+- ✅ 结论明确果断，如"我们认为"、"后市大概率"
+- ❌ 不要照抄历史文案的具体数字和结论
+
+---
+
 **当前市场数据：**
 - 当前价格: ${current_price:,.2f}
 - 周涨跌幅: {weekly_change:+.2f}%
@@ -42,23 +72,6 @@ PROMPTS = {
 
 ---
 
-**任务：**
-1. **第一步 - 元认知分析**：
-   阅读上面的历史论证框架，总结它们分别用了哪些维度的论证（技术面/资金面/链上/衍生品），
-   以及如何组合这些维度形成完整结论。
-
-2. **第二步 - 应用框架**：
-   将上述论证框架应用到当前市场数据，生成 200-300 字的专业分析。
-
-**写作要求：**
-- ✅ 多维度交叉验证（技术 + 资金 + 链上/衍生品）
-- ✅ 数据驱动，明确指出关键价格位/指标
-- ✅ 自然过渡，避免"首先、其次、最后"
-- ✅ 结论明确果断，如"我们认为"、"后市大概率"
-- ❌ 不要照抄历史文案的具体数字和结论
-
----
-
 **参考历史片段（仅学习风格，不要照抄）：**
 {style_guide}
 
@@ -69,6 +82,18 @@ PROMPTS = {
 
     "macro_analysis": """你是一位宏观经济分析师，正在撰写加密市场周报的宏观环境部分。
 
+**任务：**
+1. 分析下方历史框架如何将宏观因素（美元/利率/风险偏好）与加密市场联系起来
+2. 应用相同逻辑，结合当前数据生成 150-200 字的分析
+
+**写作要求：**
+- 聚焦宏观因素对加密市场的传导机制
+- 突出关键变化点（如美元指数转折、利率预期变化）
+- 避免冗长，直接切入要点
+- 自然过渡，不使用"首先、其次"
+
+---
+
 **当前宏观数据：**
 
 **美元指数 (DXY)：**
@@ -92,18 +117,6 @@ PROMPTS = {
 
 ---
 
-**任务：**
-1. 分析上述历史框架如何将宏观因素（美元/利率/风险偏好）与加密市场联系起来
-2. 应用相同逻辑，结合当前数据生成 150-200 字的分析
-
-**写作要求：**
-- 聚焦宏观因素对加密市场的传导机制
-- 突出关键变化点（如美元指数转折、利率预期变化）
-- 避免冗长，直接切入要点
-- 自然过渡，不使用"首先、其次"
-
----
-
 **参考历史片段：**
 {style_guide}
 
@@ -114,7 +127,15 @@ PROMPTS = {
 
     "onchain_analysis": """你是一位链上数据分析师，正在撰写 BTC 链上指标分析。
 
-请基于以下数据生成 150-200 字的分析：
+请基于下方数据生成 150-200 字的分析。
+
+**分析要求：**
+1. 解读链上数据的市场含义
+2. 识别关键支撑/压力位
+3. 分析大户行为趋势
+4. 数据优先，避免推测
+
+---
 
 **筹码分布 (URPD)：**
 {urpd_summary}
@@ -125,24 +146,12 @@ PROMPTS = {
 **鲸鱼动向：**
 {whale_summary}
 
-**分析要求：**
-1. 解读链上数据的市场含义
-2. 识别关键支撑/压力位
-3. 分析大户行为趋势
-4. 数据优先，避免推测
-
 请直接输出分析文案：
 """,
 
     "summary": """你是一位资深加密货币分析师，正在撰写周报的总结部分。
 
-请基于本周的关键数据和分析，生成 100-150 字的总结：
-
-**关键数据点：**
-{key_metrics}
-
-**主要观察：**
-{main_observations}
+请基于本周的关键数据和分析，生成 100-150 字的总结。
 
 **总结要求：**
 1. 提炼本周最重要的 2-3 个观察
@@ -150,24 +159,92 @@ PROMPTS = {
 3. 为读者提供可操作的洞察
 4. 简洁有力，避免套话
 
+---
+
+**关键数据点：**
+{key_metrics}
+
+**主要观察：**
+{main_observations}
+
 请直接输出总结文案：
 """
 }
 
 
+# RAG 未启用或检索失败时可缺省的字段
+OPTIONAL_PROMPT_FIELDS = {"reasoning_examples": "", "style_guide": ""}
+
+
+def _compile_prompt(template: str) -> Callable[[Dict], str]:
+    """
+    预解析 Prompt 模板，返回按上下文渲染的函数
+
+    模板只在模块加载时解析一次，渲染时直接按 (文本, 字段, 格式) 拼接，
+    结果与 template.format(**context) 一致
+
+    Args:
+        template: str.format 风格的模板
+
+    Returns:
+        render(context) -> str
+    """
+    parts = []
+    for literal, field, spec, conversion in string.Formatter().parse(template):
+        if conversion is not None:
+            raise ValueError(f"Prompt 模板不支持转换符: {field}!{conversion}")
+        parts.append((literal, field, spec))
+
+    def render(context: Dict) -> str:
+        out = []
+        for literal, field, spec in parts:
+            out.append(literal)
+            if field is not None:
+                if field in OPTIONAL_PROMPT_FIELDS:
+                    value = context.get(field, OPTIONAL_PROMPT_FIELDS[field])
+                else:
+                    value = context[field]
+                out.append(format(value, spec))
+        return "".join(out)
+
+    return render
+
+
+_COMPILED_PROMPTS = {name: _compile_prompt(template) for name, template in PROMPTS.items()}
+
+# 批量生成时同时在途的请求数上限，避免触发供应商限流（OpenRouter 免费档尤甚）
+LLM_MAX_CONCURRENCY = int(os.getenv("RF_LLM_CONCURRENCY", "4"))
+
+# 响应缓存：以完整请求（模型 + 系统提示 + prompt + 采样参数）的哈希为键，
+# 同一周数据重跑时直接返回已付费生成的结果（缓存目录 LLM_CACHE_DIR，随 clear_cache 清理）
+LLM_CACHE_TTL_SECONDS = 7 * 86400
+
+
 class LLMWriter:
     """LLM 文案生成器"""
 
-    def __init__(self, model: str = "gpt-4o", api_key: Optional[str] = None):
+    def __init__(self, model: str = "gpt-4o", api_key: Optional[str] = None,
+                 max_concurrency: Optional[int] = None, cache_enabled: bool = True):
         """
         初始化 LLM Writer
 
         Args:
             model: 模型名称 ("gpt-4o" 或 "gemini")
             api_key: API 密钥（如果不提供则从环境变量读取）
+            max_concurrency: 批量生成时的最大并发请求数（默认 RF_LLM_CONCURRENCY，4）
+            cache_enabled: 是否启用响应缓存（prompt 完全相同时直接返回上次结果）
         """
         self.model = model.lower()
         self.api_key = api_key
+        self.max_concurrency = max(1, max_concurrency or LLM_MAX_CONCURRENCY)
+        self.cache_enabled = cache_enabled
+        if cache_enabled:
+            os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+
+        # 异步客户端与事件循环绑定，每个循环一个（见 _get_async_client）；
+        # 实例可能被多个会话线程共享，增删需加锁
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._async_clients_lock = threading.Lock()
 
         if self.model.startswith("gpt"):
             self._init_openai()
@@ -187,14 +264,15 @@ class LLMWriter:
 
             # 检测是否是 OpenRouter API Key
             if api_key.startswith("sk-or-"):
-                self.client = OpenAI(
-                    api_key=api_key,
-                    base_url="https://openrouter.ai/api/v1"
-                )
-                logger.info(f"已初始化 OpenRouter 客户端，模型: {self.model}")
+                client_kwargs = {"api_key": api_key, "base_url": "https://openrouter.ai/api/v1"}
+                provider = "OpenRouter"
             else:
-                self.client = OpenAI(api_key=api_key)
-                logger.info(f"已初始化 OpenAI 客户端，模型: {self.model}")
+                client_kwargs = {"api_key": api_key}
+                provider = "OpenAI"
+
+            self.client = OpenAI(**client_kwargs)
+            self._client_kwargs = client_kwargs
+            logger.info(f"已初始化 {provider} 客户端，模型: {self.model}")
 
         except ImportError:
             raise ImportError("请安装 openai: pip install openai")
@@ -213,6 +291,7 @@ class LLMWriter:
             # 使用最新的 Gemini 模型（gemini-pro 已废弃）
             model_name = "gemini-2.5-flash" if "flash" in self.model else "gemini-2.5-pro"
             self.client = genai.GenerativeModel(model_name)
+            self._gemini_model_name = model_name
             logger.info(f"已初始化 Gemini 客户端，模型: {model_name}")
 
         except ImportError:
@@ -232,29 +311,177 @@ class LLMWriter:
         Returns:
             生成的文案
         """
-        if prompt_type not in PROMPTS:
-            raise ValueError(f"未知的 prompt 类型: {prompt_type}")
+        return "".join(self.generate_stream(prompt_type, context, temperature, max_tokens)).strip()
+
+    def generate_stream(self, prompt_type: str, context: Dict,
+                        temperature: float = 0.7, max_tokens: int = 800) -> Iterator[str]:
+        """
+        流式生成文案，边生成边产出文本片段（首字延迟低，便于界面实时展示）
+
+        Args:
+            prompt_type: Prompt 类型
+            context: 上下文数据字典
+            temperature: 生成温度
+            max_tokens: 最大 token 数
+
+        Yields:
+            文本片段；缓存命中时一次性产出完整文案
+        """
+        prompt = self._format_prompt(prompt_type, context)
 
-        # 格式化 prompt
-        prompt = PROMPTS[prompt_type].format(**context)
+        cache_key = self._response_cache_key(prompt, temperature, max_tokens)
+        cached = self._load_cached_response(cache_key)
+        if cached is not None:
+            logger.info(f"文案缓存命中: {prompt_type}")
+            yield cached
+            return
 
         logger.info(f"正在生成文案: {prompt_type}, 模型: {self.model}")
 
+        parts = []
+        try:
+            if self.model.startswith("gpt"):
+                stream = self._stream_openai(prompt, temperature, max_tokens)
+            else:
+                stream = self._stream_gemini(prompt, temperature, max_tokens)
+            for piece in stream:
+                parts.append(piece)
+                yield piece
+        except Exception as e:
+            logger.error(f"文案生成失败: {e}")
+            raise
+
+        content = "".join(parts).strip()
+        logger.info(f"{prompt_type} 生成完成，共 {len(content)} 字")
+        self._save_cached_response(cache_key, content)
+
+    async def agenerate(self, prompt_type: str, context: Dict,
+                        temperature: float = 0.7, max_tokens: int = 800) -> str:
+        """
+        异步生成文案（使用各平台的原生异步接口，便于并发调度多个任务）
+
+        Args:
+            prompt_type: Prompt 类型
+            context: 上下文数据字典
+            temperature: 生成温度
+            max_tokens: 最大 token 数
+
+        Returns:
+            生成的文案
+        """
+        prompt = self._format_prompt(prompt_type, context)
+
+        cache_key = self._response_cache_key(prompt, temperature, max_tokens)
+        cached = self._load_cached_response(cache_key)
+        if cached is not None:
+            logger.info(f"文案缓存命中: {prompt_type}")
+            return cached
+
+        logger.info(f"正在异步生成文案: {prompt_type}, 模型: {self.model}")
+
         try:
             if self.model.startswith("gpt"):
-                return self._generate_openai(prompt, temperature, max_tokens)
+                content = await self._agenerate_openai(prompt, temperature, max_tokens)
             else:
-                return self._generate_gemini(prompt, temperature, max_tokens)
+                content = await self._agenerate_gemini(prompt, temperature, max_tokens)
         except Exception as e:
             logger.error(f"文案生成失败: {e}")
             raise
 
-    def _generate_openai(self, prompt: str, temperature: float, max_tokens: int) -> str:
-        """使用 OpenAI 生成"""
-        response = self.client.chat.completions.create(
+        self._save_cached_response(cache_key, content)
+        return content
+
+    def _response_cache_key(self, prompt: str, temperature: float, max_tokens: int) -> Optional[str]:
+        """响应缓存键：覆盖影响输出的全部请求参数，未启用缓存时返回 None"""
+        if not self.cache_enabled:
+            return None
+        payload = "\x1f".join([self.model, SYSTEM_PROMPT, prompt, str(temperature), str(max_tokens)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load_cached_response(self, cache_key: Optional[str]) -> Optional[str]:
+        """读取未过期的缓存响应，未命中返回 None"""
+        if cache_key is None:
+            return None
+        path = os.path.join(LLM_CACHE_DIR, f"{cache_key}.json")
+        try:
+            if time.time() - os.path.getmtime(path) > LLM_CACHE_TTL_SECONDS:
+                return None
+            with open(path, 'rb') as f:
+                return json_loads(f.read())["content"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_cached_response(self, cache_key: Optional[str], content: str):
+        """写入缓存响应（先写临时文件再原子替换）；空响应不缓存，下次重新生成"""
+        if cache_key is None or not content:
+            return
+        path = os.path.join(LLM_CACHE_DIR, f"{cache_key}.json")
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(json_dumps({"model": self.model, "content": content}))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"文案缓存保存失败: {e}")
+
+    def _get_async_client(self):
+        """
+        获取当前事件循环对应的异步客户端
+
+        异步连接池绑定创建时的事件循环，而 LLMWriter 可能被多个线程各自的 asyncio.run 共用，
+        因此按事件循环分别创建，循环回收后对应条目自动移除
+        """
+        loop = asyncio.get_running_loop()
+        with self._async_clients_lock:
+            client = self._async_clients.get(loop)
+            if client is None:
+                if self.model.startswith("gpt"):
+                    from openai import AsyncOpenAI
+                    client = AsyncOpenAI(**self._client_kwargs)
+                else:
+                    import google.generativeai as genai
+                    client = genai.GenerativeModel(self._gemini_model_name)
+                self._async_clients[loop] = client
+        return client
+
+    async def _aclose_async_client(self):
+        """关闭当前事件循环的异步客户端，释放其连接池（事件循环结束前调用）"""
+        with self._async_clients_lock:
+            client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        close = getattr(client, "close", None)  # Gemini GenerativeModel 无需关闭
+        if close is not None:
+            await close()
+
+    def _format_prompt(self, prompt_type: str, context: Dict) -> str:
+        """校验 prompt 类型并格式化 prompt"""
+        if prompt_type not in _COMPILED_PROMPTS:
+            raise ValueError(f"未知的 prompt 类型: {prompt_type}")
+
+        return _COMPILED_PROMPTS[prompt_type](context)
+
+    def _stream_openai(self, prompt: str, temperature: float, max_tokens: int) -> Iterator[str]:
+        """使用 OpenAI 流式接口生成"""
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def _agenerate_openai(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        """使用 OpenAI 异步客户端生成"""
+        response = await self._get_async_client().chat.completions.create(
             model=self.model,
             messages=[
-                {"role": "system", "content": "你是一位专业的加密货币分析师，擅长撰写简洁、数据驱动的市场分析。"},
+                {"role": "system", "content": SYSTEM_PROMPT},
                 {"role": "user", "content": prompt}
             ],
             temperature=temperature,
@@ -266,14 +493,31 @@ class LLMWriter:
 
         return content
 
-    def _generate_gemini(self, prompt: str, temperature: float, max_tokens: int) -> str:
-        """使用 Gemini 生成"""
+    def _stream_gemini(self, prompt: str, temperature: float, max_tokens: int) -> Iterator[str]:
+        """使用 Gemini 流式接口生成"""
         generation_config = {
             "temperature": temperature,
             "max_output_tokens": max_tokens,
         }
 
         response = self.client.generate_content(
+            prompt,
+            generation_config=generation_config,
+            stream=True
+        )
+
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+
+    async def _agenerate_gemini(self, prompt: str, temperature: float, max_tokens: int) -> str:
+        """使用 Gemini 异步接口生成"""
+        generation_config = {
+            "temperature": temperature,
+            "max_output_tokens": max_tokens,
+        }
+
+        response = await self._get_async_client().generate_content_async(
             prompt,
             generation_config=generation_config
         )
@@ -285,7 +529,7 @@ class LLMWriter:
 
     def generate_batch(self, tasks: List[Dict]) -> Dict[str, str]:
         """
-        批量生成文案
+        批量生成文案（同步入口，内部并发执行；不能在已运行的事件循环中调用，此时请用 agenerate_batch）
 
         Args:
             tasks: 任务列表，每个任务包含 {"type": "...", "context": {...}}
@@ -293,21 +537,40 @@ class LLMWriter:
         Returns:
             {"type1": "content1", "type2": "content2", ...}
         """
-        results = {}
+        async def run_batch():
+            try:
+                return await self.agenerate_batch(tasks)
+            finally:
+                # 事件循环随 asyncio.run 结束，其客户端不会再被复用
+                await self._aclose_async_client()
 
-        for task in tasks:
-            prompt_type = task["type"]
-            context = task["context"]
+        return asyncio.run(run_batch())
+
+    async def agenerate_batch(self, tasks: List[Dict]) -> Dict[str, str]:
+        """
+        并发批量生成文案，总耗时约等于最慢的单个任务；单个任务失败不影响其他任务
+
+        Args:
+            tasks: 任务列表，每个任务包含 {"type": "...", "context": {...}}
+
+        Returns:
+            {"type1": "content1", "type2": "content2", ...}，失败的任务为 "[生成失败: ...]"
+        """
+        # 信号量在当前事件循环内创建，限制同时在途的请求数
+        semaphore = asyncio.Semaphore(self.max_concurrency)
 
+        async def generate_one(task: Dict):
+            prompt_type = task["type"]
             try:
-                content = self.generate(prompt_type, context)
-                results[prompt_type] = content
+                async with semaphore:
+                    content = await self.agenerate(prompt_type, task["context"])
                 logger.info(f"✅ {prompt_type} 生成成功")
+                return prompt_type, content
             except Exception as e:
                 logger.error(f"❌ {prompt_type} 生成失败: {e}")
-                results[prompt_type] = f"[生成失败: {str(e)}]"
+                return prompt_type, f"[生成失败: {str(e)}]"
 
-        return results
+        return dict(await asyncio.gather(*(generate_one(task) for task in tasks)))
 
 
 class ContentCache:
@@ -334,12 +597,12 @@ class ContentCache:
         filename = f"draft_{version}.json"
         filepath = os.path.join(self.cache_dir, filename)
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump({
+        with open(filepath, 'wb') as f:
+            f.write(json_dumps({
                 "version": version,
                 "timestamp": datetime.now().isoformat(),
                 "content": content
-            }, f, ensure_ascii=False, indent=2)
+            }, indent=True))
 
         logger.info(f"文案已保存: {filepath}")
         return filepath
@@ -349,32 +612,74 @@ class ContentCache:
         filename = f"draft_{version}.json"
         filepath = os.path.join(self.cache_dir, filename)
 
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        with open(filepath, 'rb') as f:
+            data = json_loads(f.read())
 
         logger.info(f"文案已加载: {filepath}")
         return data
 
     def list_versions(self) -> List[Dict]:
-        """列出所有版本"""
-        import glob
+        """
+        列出所有版本
 
-        files = glob.glob(os.path.join(self.cache_dir, "draft_*.json"))
+        版本号取自文件名（draft_{version}.json），时间取文件修改时间，无需逐个读取解析 JSON
+        """
         versions = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not (entry.name.startswith("draft_") and entry.name.endswith(".json")):
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                except OSError as e:
+                    logger.warning(f"无法读取文件 {entry.path}: {e}")
+                    continue
+                versions.append({
+                    "version": entry.name[len("draft_"):-len(".json")],
+                    "timestamp": datetime.fromtimestamp(mtime).isoformat(),
+                    "filepath": entry.path
+                })
+
+        versions.sort(key=lambda v: v["version"], reverse=True)
+        return versions
 
-        for filepath in sorted(files, reverse=True):
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    versions.append({
-                        "version": data["version"],
-                        "timestamp": data["timestamp"],
-                        "filepath": filepath
-                    })
-            except Exception as e:
-                logger.warning(f"无法读取文件 {filepath}: {e}")
 
-        return versions
+# 已格式化上下文的内存缓存 {函数名:数据哈希: 上下文}
+_CONTEXT_CACHE: "OrderedDict[str, Dict]" = OrderedDict()
+_CONTEXT_CACHE_SIZE = 16
+
+
+def data_fingerprint(*parts) -> str:
+    """对原始数据做内容哈希（键排序后序列化），用于判断输入是否变化"""
+    payload = json_dumps(parts, sort_keys=True)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def memoized_context(prepare_fn: Callable[..., Dict], *args, version: Optional[str] = None) -> Dict:
+    """
+    按输入数据的内容哈希缓存 prepare_*_context 的结果
+
+    辩论轮次中同一份数据会被重复格式化，命中缓存时直接复用；
+    调用方会往上下文中写入 RAG 结果，因此返回副本
+
+    Args:
+        prepare_fn: prepare_btc_context / prepare_macro_context
+        *args: 传给 prepare_fn 的原始数据
+        version: 已算好的数据哈希（需覆盖 args），为 None 时按 args 计算
+
+    Returns:
+        格式化的上下文字典（副本）
+    """
+    key = f"{prepare_fn.__name__}:{version or data_fingerprint(*args)}"
+    context = _CONTEXT_CACHE.get(key)
+    if context is None:
+        context = prepare_fn(*args)
+        _CONTEXT_CACHE[key] = context
+        if len(_CONTEXT_CACHE) > _CONTEXT_CACHE_SIZE:
+            _CONTEXT_CACHE.popitem(last=False)
+    else:
+        _CONTEXT_CACHE.move_to_end(key)
+    return dict(context)
 
 
 def prepare_btc_context(btc_data: Dict, macro_data: Optional[Dict] = None) -> Dict:
@@ -390,9 +695,9 @@ def prepare_btc_context(btc_data: Dict, macro_data: Optional[Dict] = None) -> Di
     """
     # 提取价格数据
     price_data = btc_data.get("price", {})
-    prices = price_data.get("close", [])
+    prices = np.asarray(price_data.get("close", []), dtype=np.float64)
 
-    if not prices:
+    if prices.size == 0:
         # 如果没有价格数据，返回空上下文
         return {
             "current_price": 0,
@@ -403,14 +708,14 @@ def prepare_btc_context(btc_data: Dict, macro_data: Optional[Dict] = None) -> Di
             "macro_context": "数据暂无"
         }
 
-    current_price = prices[-1]
-    weekly_change = ((prices[-1] - prices[-7]) / prices[-7] * 100) if len(prices) >= 7 else 0
-    high_30d = max(prices)
-    low_30d = min(prices)
+    current_price = float(prices[-1])
+    weekly_change = float(pct_change(prices, 7))
+    high_30d = float(prices.max())
+    low_30d = float(prices.min())
 
     # 计算简单技术指标 (MA7, MA30)
-    ma7 = sum(prices[-7:]) / len(prices[-7:]) if len(prices) >= 7 else current_price
-    ma30 = sum(prices[-30:]) / len(prices[-30:]) if len(prices) >= 30 else current_price
+    ma7 = float(prices[-7:].mean()) if prices.size >= 7 else current_price
+    ma30 = float(prices[-30:].mean()) if prices.size >= 30 else current_price
 
     tech_indicators = f"- MA7: ${ma7:,.0f}\n- MA30: ${ma30:,.0f}"
 
@@ -436,25 +741,18 @@ def prepare_btc_context(btc_data: Dict, macro_data: Optional[Dict] = None) -> Di
 
 def prepare_macro_context(macro_data: Dict) -> Dict:
     """准备宏观分析的上下文数据"""
-
-    def calc_change(data_dict):
-        """计算周变化"""
-        close = data_dict.get("close", [])
-        if len(close) >= 7:
-            return ((close[-1] - close[-7]) / close[-7] * 100)
-        return 0.0
-
-    def safe_get_last(data_dict, default=0.0):
-        """安全获取最后一个值"""
-        close = data_dict.get("close", [])
-        return close[-1] if close else default
+    # 每个指标的收盘价序列只取一次
+    closes = {
+        key: macro_data.get(key, {}).get("close", [])
+        for key in ("dxy", "us10y", "sp500", "nvda", "coin")
+    }
 
     return {
-        "dxy_current": safe_get_last(macro_data.get("dxy", {}), default=100.0),
-        "dxy_change": calc_change(macro_data.get("dxy", {})),
-        "us10y_current": safe_get_last(macro_data.get("us10y", {}), default=4.0),
-        "us10y_change": calc_change(macro_data.get("us10y", {})) * 100,  # 转换为 bps
-        "sp500_change": calc_change(macro_data.get("sp500", {})),
-        "nvda_change": calc_change(macro_data.get("nvda", {})),
-        "coin_change": calc_change(macro_data.get("coin", {}))
+        "dxy_current": closes["dxy"][-1] if closes["dxy"] else 100.0,
+        "dxy_change": pct_change(closes["dxy"], 7),
+        "us10y_current": closes["us10y"][-1] if closes["us10y"] else 4.0,
+        "us10y_change": pct_change(closes["us10y"], 7) * 100,  # 转换为 bps
+        "sp500_change": pct_change(closes["sp500"], 7),
+        "nvda_change": pct_change(closes["nvda"], 7),
+        "coin_change": pct_change(closes["coin"], 7)
     }
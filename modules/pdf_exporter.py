@@ -5,14 +5,105 @@ PDF 导出模块
 """
 
 import os
+import base64
+import hashlib
 import logging
+import mimetypes
 from typing import Dict, List, Optional
 from datetime import datetime
 from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+from .utils import CACHE_DIR
 
 logger = logging.getLogger(__name__)
 
 
+# 图表在 PDF 中的最大像素宽度：A4 正文宽约 18cm，1200px 约合 170 DPI 打印精度，
+# 且仍大于模板中 max-width: 100% 的版心宽度，排版尺寸不变
+PDF_CHART_MAX_WIDTH = 1200
+PDF_CHART_CACHE_DIR = os.path.join(CACHE_DIR, "pdf_charts")
+
+# 超过该大小的图片仍用 file:// 引用，避免 base64 后的超长字符串撑大 HTML
+INLINE_CHART_MAX_BYTES = 2 * 1024 * 1024
+
+
+@lru_cache(maxsize=64)
+def _inline_chart(path: str, mtime: float, size: int) -> str:
+    """读取图片并编码为 data URI；以 (路径, mtime, 大小) 为键，图表重新生成后自动失效"""
+    with open(path, "rb") as f:
+        encoded = base64.b64encode(f.read()).decode("ascii")
+    mime = mimetypes.guess_type(path)[0] or "image/png"
+    return f"data:{mime};base64,{encoded}"
+
+
+@lru_cache(maxsize=256)
+def _resize_for_pdf(path: str, mtime: float, size: int) -> str:
+    """
+    将超宽的位图缩放到 PDF 所需宽度并缓存，返回实际使用的图片路径
+
+    缓存文件名由 (路径, mtime, 大小, 目标宽度) 决定，图表重新生成后自动生成新文件
+    """
+    if not path.lower().endswith((".png", ".jpg", ".jpeg")):
+        return path
+
+    key = hashlib.sha256(f"{path}|{mtime}|{size}|{PDF_CHART_MAX_WIDTH}".encode()).hexdigest()[:32]
+    resized_path = os.path.join(PDF_CHART_CACHE_DIR, f"{key}.png")
+    if os.path.exists(resized_path):
+        return resized_path
+
+    from PIL import Image
+
+    with Image.open(path) as img:
+        if img.width <= PDF_CHART_MAX_WIDTH:
+            return path
+        img.thumbnail((PDF_CHART_MAX_WIDTH, PDF_CHART_MAX_WIDTH * 10), Image.LANCZOS)
+
+        os.makedirs(PDF_CHART_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{resized_path}.{os.getpid()}.tmp"
+        img.save(tmp_path, format="PNG")
+        os.replace(tmp_path, resized_path)
+
+    return resized_path
+
+
+def _chart_uri(chart_path: str) -> str:
+    """
+    图表在模板中的引用地址（chart_path 为绝对路径）
+
+    先缩放到 PDF 宽度，未变化的图表直接复用内存中的 data URI，重复导出时 WeasyPrint 不再逐个打开、缩放文件
+    """
+    try:
+        stat = os.stat(chart_path)
+    except OSError:
+        # 文件不存在时保持原行为，由 WeasyPrint 报告缺图
+        return f"file://{chart_path}"
+
+    try:
+        resized_path = _resize_for_pdf(chart_path, stat.st_mtime, stat.st_size)
+        if resized_path != chart_path:
+            chart_path, stat = resized_path, os.stat(resized_path)
+    except Exception as e:
+        logger.warning(f"图表缩放失败，使用原图: {chart_path}, {e}")
+
+    if stat.st_size > INLINE_CHART_MAX_BYTES:
+        return f"file://{chart_path}"
+    return _inline_chart(chart_path, stat.st_mtime, stat.st_size)
+
+
+def prepare_chart_assets(chart_paths: List[str]) -> None:
+    """
+    预先完成图表的缩放与 data URI 编码
+
+    这部分是 CPU 工作，可以在等待 LLM 响应时于后台线程执行，之后导出 PDF 直接命中缓存
+    """
+    for path in chart_paths:
+        try:
+            _chart_uri(os.path.abspath(path))
+        except Exception as e:
+            logger.warning(f"图表预处理失败: {path}, {e}")
+
+
 class PDFExporter:
     """PDF 导出器"""
 
@@ -108,10 +199,9 @@ class PDFExporter:
 
             if include_charts and "charts" in report_data["btc"]:
                 for chart in report_data["btc"]["charts"]:
-                    # 转换为绝对路径（WeasyPrint 需要）
                     chart_path = os.path.abspath(chart["path"])
                     btc_section["charts"].append({
-                        "path": f"file://{chart_path}",
+                        "path": _chart_uri(chart_path),
                         "title": chart.get("title", ""),
                         "caption": chart.get("caption", "")
                     })
@@ -129,7 +219,7 @@ class PDFExporter:
                 for chart in report_data["macro"]["charts"]:
                     chart_path = os.path.abspath(chart["path"])
                     macro_section["charts"].append({
-                        "path": f"file://{chart_path}",
+                        "path": _chart_uri(chart_path),
                         "title": chart.get("title", ""),
                         "caption": chart.get("caption", "")
                     })
@@ -147,7 +237,7 @@ class PDFExporter:
                 for chart in report_data["onchain"]["charts"]:
                     chart_path = os.path.abspath(chart["path"])
                     onchain_section["charts"].append({
-                        "path": f"file://{chart_path}",
+                        "path": _chart_uri(chart_path),
                         "title": chart.get("title", ""),
                         "caption": chart.get("caption", "")
                     })
@@ -161,7 +251,8 @@ def generate_report_pdf(
     chart_paths: Dict[str, List[str]],
     content: Dict[str, str],
     metrics: Optional[List[Dict]] = None,
-    output_dir: str = "output/pdf"
+    output_dir: str = "output/pdf",
+    filename: Optional[str] = None
 ) -> str:
     """
     快捷方法：生成完整周报 PDF
@@ -171,6 +262,7 @@ def generate_report_pdf(
         content: {"btc_analysis": "...", "macro_analysis": "...", ...}
         metrics: [{"label": "BTC 价格", "value": "$90,000", "delta": "+2.5%"}, ...]
         output_dir: 输出目录
+        filename: 输出文件名（不提供则按时间戳命名）
 
     Returns:
         PDF 文件路径
@@ -228,7 +320,45 @@ def generate_report_pdf(
 
     # 生成 PDF
     exporter = PDFExporter()
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    output_path = os.path.join(output_dir, f"crypto_report_{timestamp}.pdf")
+    if filename is None:
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"crypto_report_{timestamp}.pdf"
+    output_path = os.path.join(output_dir, filename)
 
     return exporter.export(output_path, report_data)
+
+
+def _render_report(job: Dict) -> str:
+    """子进程入口（需为模块级函数才能被 pickle）"""
+    return generate_report_pdf(**job)
+
+
+def generate_reports_parallel(jobs: List[Dict], max_workers: Optional[int] = None) -> List[str]:
+    """
+    多进程并行生成多份周报 PDF
+
+    WeasyPrint 排版是 CPU 密集的纯 Python 计算，线程受 GIL 限制，因此每份报告放到独立进程
+
+    Args:
+        jobs: generate_report_pdf 的参数字典列表
+        max_workers: 最大进程数（默认 CPU 核数）
+
+    Returns:
+        PDF 文件路径列表（与 jobs 顺序一致）
+    """
+    if not jobs:
+        return []
+
+    # 同一秒内生成的报告按时间戳命名会互相覆盖，未指定文件名时加序号区分
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    jobs = [
+        {"filename": f"crypto_report_{timestamp}_{i + 1}.pdf", **job}
+        for i, job in enumerate(jobs)
+    ]
+
+    workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        return [_render_report(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_render_report, jobs))
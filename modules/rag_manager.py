@@ -6,16 +6,109 @@ Manages retrieval of historical report analysis patterns for style learning
 """
 
 import os
+import math
+import time
+import hashlib
 import logging
-from typing import Dict, List, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 from pathlib import Path
-from datetime import datetime
-from langchain_community.vectorstores import Chroma
-from langchain_openai import OpenAIEmbeddings
-from langchain_core.documents import Document
+from datetime import date
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from .utils import RAG_CACHE_DIR, json_dumps, json_loads
+
+# langchain / chromadb pull in hundreds of modules; import them only when a RAGManager is built
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import Chroma
+    from langchain_openai import OpenAIEmbeddings
+    from langchain_core.documents import Document
 
 logger = logging.getLogger(__name__)
 
+# Retrieval result cache: the assembled context depends only on the queries and the
+# decay date, so re-runs within a day skip the embedding call and ANN search entirely
+# (stored under RAG_CACHE_DIR, which utils.clear_cache also clears)
+RAG_CACHE_TTL_SECONDS = 24 * 3600
+
+
+# Token budget for retrieved references: each segment and the whole style_guide are
+# capped so one long chunk cannot inflate prompt_tokens (cost and latency)
+MAX_SEGMENT_TOKENS = 300
+MAX_STYLE_GUIDE_TOKENS = 1500
+
+
+@lru_cache(maxsize=1)
+def _token_encoder():
+    """gpt-4o tokenizer (tiktoken ships with langchain_openai); None if unavailable"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken unavailable, budgeting references by characters: {e}")
+        return None
+
+
+def _truncate_tokens(text: str, limit: int) -> Tuple[str, int]:
+    """
+    Keep at most `limit` tokens of text
+
+    Returns:
+        (truncated text, token count); without tiktoken one character counts as one
+        token, which is conservative for the Chinese report text
+    """
+    encoder = _token_encoder()
+    if encoder is None:
+        return text[:limit], min(len(text), limit)
+
+    tokens = encoder.encode(text)
+    if len(tokens) <= limit:
+        return text, len(tokens)
+    # A cut can land inside a multi-byte character; drop the replacement char
+    return encoder.decode(tokens[:limit]).rstrip("\ufffd"), limit
+
+
+# Chroma distance -> relevance in [0, 1] per hnsw:space (the same scales LangChain
+# applies in similarity_search_with_relevance_scores)
+_RELEVANCE_FNS = {
+    "l2": lambda distance: 1.0 - distance / math.sqrt(2),
+    "cosine": lambda distance: 1.0 - distance,
+    "ip": lambda distance: 1.0 - distance if distance > 0 else -distance,
+}
+
+
+@lru_cache(maxsize=4)
+def _load_vector_store(
+    chroma_dir: str,
+    collection_name: str,
+    embedding_model: str,
+    api_key: Optional[str]
+) -> Tuple["OpenAIEmbeddings", "Chroma", str]:
+    """
+    Open the embedding client and Chroma collection once per process
+
+    RAGManager is created on every analyst round; reopening the sqlite store and
+    HNSW index each time is pure overhead. Call _load_vector_store.cache_clear()
+    after rebuilding the store in the same process.
+
+    Returns:
+        (embeddings, vector_store, distance space of the collection)
+    """
+    import chromadb
+    from langchain_openai import OpenAIEmbeddings
+    from langchain_community.vectorstores import Chroma
+
+    logger.info(f"Loading existing vector store: {chroma_dir}")
+    embeddings = OpenAIEmbeddings(model=embedding_model, openai_api_key=api_key)
+    client = chromadb.PersistentClient(path=chroma_dir)
+    vector_store = Chroma(
+        collection_name=collection_name,
+        embedding_function=embeddings,
+        client=client
+    )
+    # build_vector_store.py creates the collection with Chroma's default (l2)
+    metadata = client.get_collection(collection_name).metadata or {}
+    return embeddings, vector_store, metadata.get("hnsw:space", "l2")
+
 
 class RAGManager:
     """RAG Knowledge Base Manager"""
@@ -24,7 +117,8 @@ class RAGManager:
         self,
         chroma_dir: str = "./chroma_db",
         collection_name: str = "crypto_weekly_reports",
-        embedding_model: str = "text-embedding-3-small"
+        embedding_model: str = "text-embedding-3-small",
+        cache_enabled: bool = True
     ):
         """
         Initialize RAG Manager
@@ -33,34 +127,30 @@ class RAGManager:
             chroma_dir: ChromaDB persistence directory
             collection_name: Collection name
             embedding_model: OpenAI Embedding model
+            cache_enabled: Cache assembled retrieval results on disk for 24h
         """
         self.chroma_dir = chroma_dir
         self.collection_name = collection_name
+        self.cache_enabled = cache_enabled
+        if cache_enabled:
+            os.makedirs(RAG_CACHE_DIR, exist_ok=True)
 
         # Initialize Embedding (use EMBEDDING env var if available)
         embedding_api_key = os.getenv("EMBEDDING") or os.getenv("EMBEDDINGS") or os.getenv("OPENAI_API_KEY")
-        self.embeddings = OpenAIEmbeddings(model=embedding_model, openai_api_key=embedding_api_key)
 
         # Load VectorStore
-        self.vector_store = self._init_vector_store()
-
-        logger.info(f"✅ RAG Manager initialized, Collection: {collection_name}")
-
-    def _init_vector_store(self) -> Chroma:
-        """Initialize vector database"""
-        if os.path.exists(self.chroma_dir):
-            # Load existing vector store
-            logger.info(f"Loading existing vector store: {self.chroma_dir}")
-            return Chroma(
-                collection_name=self.collection_name,
-                embedding_function=self.embeddings,
-                persist_directory=self.chroma_dir
-            )
-        else:
+        if not os.path.exists(chroma_dir):
             # Vector store doesn't exist
-            logger.warning(f"Vector store not found: {self.chroma_dir}")
+            logger.warning(f"Vector store not found: {chroma_dir}")
             logger.warning("Please run scripts/build_vector_store.py first")
-            raise FileNotFoundError(f"Vector store not found: {self.chroma_dir}")
+            raise FileNotFoundError(f"Vector store not found: {chroma_dir}")
+
+        self.embeddings, self.vector_store, distance_space = _load_vector_store(
+            os.path.abspath(chroma_dir), collection_name, embedding_model, embedding_api_key
+        )
+        self._relevance_fn = _RELEVANCE_FNS[distance_space]
+
+        logger.info(f"✅ RAG Manager initialized, Collection: {collection_name}")
 
     def retrieve_context(
         self,
@@ -85,29 +175,130 @@ class RAGManager:
         # Step 1: Build multiple retrieval queries
         queries = self._build_queries(prompt_type, current_data)
 
-        # Step 2: Execute retrieval
-        all_results = []
-        for query_config in queries:
-            try:
-                results = self.vector_store.similarity_search(
-                    query=query_config["query"],
-                    k=query_config["k"],
-                    filter=query_config.get("filter", {})
-                )
-                all_results.extend(results)
-            except Exception as e:
-                logger.warning(f"Retrieval query failed: {query_config['query']}, Error: {e}")
-                continue
+        cache_file = self._cache_path(prompt_type, queries, time_decay_days)
+        cached = self._load_cached(cache_file)
+        if cached is not None:
+            logger.info(f"✅ [RAG] Cache hit for {prompt_type}")
+            return cached
 
-        # Step 3: Time decay reranking
+        # Step 2: Embed all queries in one API round-trip
+        try:
+            vectors = self.embeddings.embed_documents([q["query"] for q in queries])
+        except Exception as e:
+            logger.warning(f"Batch query embedding failed, falling back to per-query search: {e}")
+            vectors = [None] * len(queries)
+
+        # Step 3: Execute retrieval concurrently (Chroma's ANN search releases the GIL)
+        all_results = []
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            futures = [
+                executor.submit(self._search, query_config, vector)
+                for query_config, vector in zip(queries, vectors)
+            ]
+            # Collect in submission order so tie-breaking in the rerank stays deterministic
+            for query_config, future in zip(queries, futures):
+                try:
+                    all_results.extend(future.result())
+                except Exception as e:
+                    logger.warning(f"Retrieval query failed: {query_config['query']}, Error: {e}")
+                    continue
+
+        # Step 4: Drop documents returned by more than one query, keeping the best relevance
+        all_results = self._dedupe(all_results)
+
+        # Step 5: Rerank by similarity x time decay
         ranked_results = self._apply_time_decay(all_results, time_decay_days)
 
-        # Step 4: Assemble context
+        # Step 6: Assemble context
         context = self._assemble_context(ranked_results, prompt_type)
+        self._save_cached(cache_file, context)
 
         logger.info(f"✅ [RAG] Retrieved {len(ranked_results)} reference segments for {prompt_type}")
         return context
 
+    def _cache_path(self, prompt_type: str, queries: List[Dict], decay_days: int) -> Optional[str]:
+        """
+        Cache file for a retrieval, None when caching is disabled
+
+        Queries are already canonical (e.g. btc_analysis only varies by price trend), so
+        they are hashed instead of the raw data. The date is part of the key because
+        time decay weights change daily.
+        """
+        if not self.cache_enabled:
+            return None
+        payload = json_dumps({
+            "collection": self.collection_name,
+            "chroma_dir": os.path.abspath(self.chroma_dir),
+            "type": prompt_type,
+            "queries": queries,
+            "decay": decay_days,
+            "ranking": "similarity_x_decay",
+            "budget": [MAX_SEGMENT_TOKENS, MAX_STYLE_GUIDE_TOKENS],
+            "date": date.today().isoformat(),
+        }, sort_keys=True)
+        key = hashlib.blake2b(payload, digest_size=16).hexdigest()
+        return os.path.join(RAG_CACHE_DIR, f"{key}.json")
+
+    def _load_cached(self, cache_file: Optional[str]) -> Optional[Dict[str, str]]:
+        """Load a cached context if present and not expired"""
+        if cache_file is None:
+            return None
+        try:
+            if time.time() - os.path.getmtime(cache_file) > RAG_CACHE_TTL_SECONDS:
+                return None
+            with open(cache_file, 'rb') as f:
+                return json_loads(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _save_cached(self, cache_file: Optional[str], context: Dict[str, str]):
+        """Write a context to the cache (temp file + atomic replace)"""
+        if cache_file is None:
+            return
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_file, 'wb') as f:
+                f.write(json_dumps(context))
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logger.warning(f"Failed to save RAG cache: {e}")
+
+    def _search(self, query_config: Dict, vector: Optional[List[float]]) -> List[Tuple["Document", float]]:
+        """
+        Run one retrieval query, using the pre-computed embedding when available
+
+        Returns (document, relevance) pairs with relevance in [0, 1], higher is more similar
+        """
+        if vector is None:
+            return self.vector_store.similarity_search_with_relevance_scores(
+                query_config["query"],
+                k=query_config["k"],
+                filter=query_config.get("filter", {})
+            )
+        # The by-vector variant returns raw distances; convert them for the collection's
+        # distance space so both paths share one scale
+        results = self.vector_store.similarity_search_by_vector_with_relevance_scores(
+            vector,
+            k=query_config["k"],
+            filter=query_config.get("filter", {})
+        )
+        return [(doc, self._relevance_fn(distance)) for doc, distance in results]
+
+    @staticmethod
+    def _dedupe(results: List[Tuple["Document", float]]) -> List[Tuple["Document", float]]:
+        """
+        Deduplicate (document, relevance) pairs across queries
+
+        Keyed by metadata["chunk_id"] (set by build_vector_store.py); stores built before
+        chunk ids existed fall back to the chunk text
+        """
+        best = {}
+        for doc, relevance in results:
+            key = doc.metadata.get("chunk_id") or doc.page_content
+            if key not in best or relevance > best[key][1]:
+                best[key] = (doc, relevance)
+        return list(best.values())
+
     def _build_queries(self, prompt_type: str, current_data: Dict) -> List[Dict]:
         """Build retrieval queries (Multi-Query strategy)"""
 
@@ -191,37 +382,39 @@ class RAGManager:
             "k": 3
         }]
 
-    def _apply_time_decay(self, results: List[Document], decay_days: int) -> List[Document]:
+    def _apply_time_decay(self, results: List[Tuple["Document", float]], decay_days: int) -> List["Document"]:
         """
-        Apply time decay to retrieval results, prioritize recent reports
+        Apply time decay to retrieval results, prioritize relevant and recent reports
 
         Args:
-            results: Retrieval results
+            results: (document, relevance) pairs from retrieval
             decay_days: Half-life (weight drops to 50% after this many days)
         """
-        now = datetime.now()
+        today = date.today()
 
-        for doc in results:
+        docs = []
+        for doc, relevance in results:
             try:
-                doc_date = datetime.strptime(doc.metadata["date"], "%Y-%m-%d")
-                days_ago = (now - doc_date).days
+                # date.fromisoformat is a C-level parser, much cheaper than strptime
+                days_ago = (today - date.fromisoformat(doc.metadata["date"])).days
 
-                # Exponential decay: score_new = score_original * exp(-days_ago / decay_days)
+                # Exponential decay: weight halves every decay_days
                 time_weight = 2 ** (-days_ago / decay_days)
 
-                # Note: similarity_search doesn't return scores by default
-                # If needed, use similarity_search_with_score
-                doc.metadata["time_weight"] = time_weight
-
             except Exception as e:
                 logger.warning(f"Time decay calculation failed: {e}")
-                doc.metadata["time_weight"] = 1.0
+                time_weight = 1.0
+
+            # Final score = similarity x time weight
+            doc.metadata["time_weight"] = time_weight
+            doc.metadata["score"] = max(relevance, 0.0) * time_weight
+            docs.append(doc)
 
-        # Sort by time weight (prioritize recent)
-        results.sort(key=lambda x: x.metadata.get("time_weight", 0), reverse=True)
-        return results
+        # Sort by fused score
+        docs.sort(key=lambda x: x.metadata["score"], reverse=True)
+        return docs
 
-    def _assemble_context(self, results: List[Document], prompt_type: str) -> Dict[str, str]:
+    def _assemble_context(self, results: List["Document"], prompt_type: str) -> Dict[str, str]:
         """
         Assemble context into Prompt-usable format
 
@@ -245,13 +438,22 @@ class RAGManager:
         reasoning_examples = []
         for analysis_type, texts in grouped.items():
             reasoning_examples.append(f"## {analysis_type} Dimension Reasoning Example:")
-            reasoning_examples.append(texts[0])  # Only take most relevant 1
-
-        # Assemble style_guide (complete reference)
-        style_guide = "\n\n---\n\n".join([
-            f"[Reference Segment {i+1}] ({doc.metadata.get('analysis_type', '')} - {doc.metadata.get('date', '')})\n{doc.page_content}"
-            for i, doc in enumerate(results[:5])  # Max 5 segments
-        ])
+            # Only take most relevant 1, capped to one segment's budget
+            reasoning_examples.append(_truncate_tokens(texts[0], MAX_SEGMENT_TOKENS)[0])
+
+        # Assemble style_guide (complete reference), stop once the total budget is spent
+        segments = []
+        used_tokens = 0
+        for i, doc in enumerate(results[:5]):  # Max 5 segments
+            remaining = MAX_STYLE_GUIDE_TOKENS - used_tokens
+            if remaining <= 0:
+                break
+            text, n_tokens = _truncate_tokens(doc.page_content, min(MAX_SEGMENT_TOKENS, remaining))
+            used_tokens += n_tokens
+            segments.append(
+                f"[Reference Segment {i+1}] ({doc.metadata.get('analysis_type', '')} - {doc.metadata.get('date', '')})\n{text}"
+            )
+        style_guide = "\n\n---\n\n".join(segments)
 
         return {
             "style_guide": style_guide,
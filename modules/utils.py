@@ -3,33 +3,165 @@
 """
 
 import os
+import json
+import queue
+import atexit
+import time
+import mmap
 import pickle
+import hashlib
 import logging
+import logging.handlers
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
-from typing import Any, Callable
+from typing import Any, Callable, Optional, Sequence
 import requests
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from requests.adapters import HTTPAdapter
 
+try:
+    import orjson
+except ImportError:  # 可选依赖, 未安装时回退到标准库 json
+    orjson = None
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('research_flow.log'),
-        logging.StreamHandler()
-    ]
-)
+
+# 配置日志: 调用线程只把日志记录放入队列, 格式化与写文件/终端在后台监听线程完成
+_log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+def _direct_log_handlers() -> list:
+    """直接写文件/终端的日志处理器"""
+    handlers = [logging.FileHandler('research_flow.log'), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(_log_formatter)
+    return handlers
+
+
+_log_handlers = _direct_log_handlers()
+
+_log_queue = queue.SimpleQueue()
+_queue_handler = logging.handlers.QueueHandler(_log_queue)
+# 入队前只合并消息参数, 时间与级别前缀由监听线程中的格式化器添加
+_queue_handler.setFormatter(logging.Formatter('%(message)s'))
+_log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers)
+_log_listener.start()
+# 退出时处理完队列中剩余的日志
+atexit.register(_log_listener.stop)
+
+logging.basicConfig(level=logging.INFO, handlers=[_queue_handler])
+
+
+def _use_direct_logging_after_fork():
+    """
+    fork 出的子进程 (图表/PDF 进程池) 不会继承监听线程, 队列中的记录无人处理;
+    子进程中把 QueueHandler 换回直接写入的处理器
+    """
+    root = logging.getLogger()
+    if _queue_handler in root.handlers:
+        root.removeHandler(_queue_handler)
+        for handler in _direct_log_handlers():
+            root.addHandler(handler)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_use_direct_logging_after_fork)
 
 logger = logging.getLogger(__name__)
 
 
+# JSON 序列化 (优先使用 orjson)
+def json_dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> bytes:
+    """
+    序列化为 UTF-8 编码的 JSON 字节, 无法序列化的对象转为字符串
+
+    Args:
+        obj: 待序列化对象
+        indent: 是否缩进 2 格
+        sort_keys: 是否按键排序
+
+    Returns:
+        JSON 字节串
+    """
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=str, option=option)
+
+    return json.dumps(
+        obj, ensure_ascii=False, default=str, indent=2 if indent else None, sort_keys=sort_keys
+    ).encode("utf-8")
+
+
+def json_loads(data: Any) -> Any:
+    """解析 JSON 字节或字符串"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 # 缓存配置
 CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cache")
 os.makedirs(CACHE_DIR, exist_ok=True)
 
 
+# 缓存文件格式: JSON (orjson, 读写更快) 优先, 其余回退 pickle
+CACHE_FILE_EXTS = (".json", ".pkl")
+# 各模块的分目录缓存 (目录内文件全部属于缓存), 随 clear_cache 清理并计入 get_cache_info
+YAHOO_HISTORY_DIR = os.path.join(CACHE_DIR, "yahoo")
+LLM_CACHE_DIR = os.path.join(CACHE_DIR, "llm")
+RAG_CACHE_DIR = os.path.join(CACHE_DIR, "rag")
+CACHE_SUBDIRS = (YAHOO_HISTORY_DIR, LLM_CACHE_DIR, RAG_CACHE_DIR)
+# 小文件 mmap 的建立开销大于省下的拷贝, 超过该大小才使用
+MMAP_MIN_BYTES = 64 * 1024
+
+
+# 进程内缓存 (磁盘缓存之前的第一级): 每个被装饰函数最多保留的条目数
+MEMORY_CACHE_MAXSIZE = 128
+# 所有被装饰函数的进程内缓存 [(缓存, 锁)], clear_cache 时一并清理
+_MEMORY_CACHES = []
+
+
+def _serialize_cache(result: Any) -> tuple:
+    """
+    序列化缓存结果
+
+    API 返回多为 JSON 形状的 dict/list, 用 orjson 序列化; 不能无损往返的结果
+    (NaN、元组、numpy/pandas 对象等) 以及未安装 orjson 时回退 pickle
+
+    Returns:
+        (字节内容, 文件扩展名)
+    """
+    if orjson is not None:
+        try:
+            payload = orjson.dumps(result)
+            if orjson.loads(payload) == result:
+                return payload, ".json"
+        except TypeError:
+            pass
+    return pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL), ".pkl"
+
+
+def _read_cache_file(cache_file: str, ext: str) -> Any:
+    """读取缓存文件; 大文件用 mmap 直接反序列化, 省去整文件读入的一次拷贝"""
+    with open(cache_file, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= MMAP_MIN_BYTES:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if ext == ".json":
+                    if orjson is None:
+                        return json_loads(mm[:])
+                    # orjson 接受 memoryview; 视图须在 mmap 关闭前释放
+                    with memoryview(mm) as view:
+                        return json_loads(view)
+                return pickle.loads(mm)
+        if ext == ".json":
+            return json_loads(f.read())
+        return pickle.load(f)
+
+
 def cache_api_call(cache_ttl_hours: int = 12):
     """
     装饰器:缓存 API 调用结果到本地文件
@@ -37,55 +169,117 @@ def cache_api_call(cache_ttl_hours: int = 12):
     Args:
         cache_ttl_hours: 缓存过期时间(小时)
 
+    同一进程内的重复调用先查内存 (LRU, 同样遵守过期时间), 不再读盘反序列化;
+    与 functools.lru_cache 一样, 命中时返回的是同一个对象, 调用方不应原地修改
+
     使用示例:
         @cache_api_call(cache_ttl_hours=12)
         def fetch_data(param1, param2):
             return api_call(param1, param2)
     """
+    ttl_seconds = cache_ttl_hours * 3600
+
     def decorator(func: Callable) -> Callable:
+        # 缓存键 -> (写入时间戳, 结果)
+        memo = OrderedDict()
+        memo_lock = threading.Lock()
+        _MEMORY_CACHES.append((memo, memo_lock))
+
+        def remember(cache_key: str, written_at: float, result: Any):
+            with memo_lock:
+                memo[cache_key] = (written_at, result)
+                memo.move_to_end(cache_key)
+                if len(memo) > MEMORY_CACHE_MAXSIZE:
+                    memo.popitem(last=False)
+
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            # 生成唯一的缓存键
-            cache_key = f"{func.__name__}_{hash(str(args) + str(kwargs))}"
-            cache_file = os.path.join(CACHE_DIR, f"{cache_key}.pkl")
-
-            # 检查缓存是否存在且未过期
-            if os.path.exists(cache_file):
-                file_time = datetime.fromtimestamp(os.path.getmtime(cache_file))
-                if datetime.now() - file_time < timedelta(hours=cache_ttl_hours):
+            # 生成唯一的缓存键 (内置 hash() 每个进程随机加盐, 重启后缓存永远不命中;
+            # kwargs 排序, 参数顺序不同的同一调用共用缓存)
+            key_bytes = repr((args, sorted(kwargs.items()))).encode("utf-8")
+            cache_key = f"{func.__name__}_{hashlib.blake2b(key_bytes, digest_size=16).hexdigest()}"
+            cache_base = os.path.join(CACHE_DIR, cache_key)
+
+            # 第一级: 进程内缓存
+            with memo_lock:
+                entry = memo.get(cache_key)
+                if entry is not None:
+                    if time.time() - entry[0] < ttl_seconds:
+                        memo.move_to_end(cache_key)
+                        return entry[1]
+                    del memo[cache_key]
+
+            # 检查缓存是否存在且未过期 (JSON 或 pickle 格式)
+            for ext in CACHE_FILE_EXTS:
+                cache_file = f"{cache_base}{ext}"
+                if not os.path.exists(cache_file):
+                    continue
+                file_mtime = os.path.getmtime(cache_file)
+                if time.time() - file_mtime < ttl_seconds:
+                    try:
+                        result = _read_cache_file(cache_file, ext)
+                    except (pickle.UnpicklingError, EOFError, ValueError) as e:
+                        # 损坏的缓存 (如旧版本非原子写入留下的半截文件) 视为未命中, 重新获取后覆盖
+                        logger.warning(f"缓存文件损坏, 重新获取数据: {cache_file}, 错误: {e}")
+                        continue
                     logger.info(f"缓存命中: {func.__name__}, 缓存文件: {cache_file}")
-                    with open(cache_file, 'rb') as f:
-                        return pickle.load(f)
+                    # 按文件写入时间记入内存, 过期时间与磁盘缓存一致
+                    remember(cache_key, file_mtime, result)
+                    return result
                 else:
                     logger.info(f"缓存过期: {func.__name__}, 重新获取数据")
 
             # 调用原函数
             logger.info(f"调用 API: {func.__name__}, 参数: args={args}, kwargs={kwargs}")
             result = func(*args, **kwargs)
+            remember(cache_key, time.time(), result)
 
-            # 保存到缓存
+            # 保存到缓存 (先写临时文件再原子替换, 并发线程不会读到写了一半的文件)
             try:
-                with open(cache_file, 'wb') as f:
-                    pickle.dump(result, f)
+                payload, ext = _serialize_cache(result)
+                cache_file = f"{cache_base}{ext}"
+                tmp_file = f"{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_file, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_file, cache_file)
+                # 删除另一种格式的旧缓存, 避免读到过期结果
+                for other_ext in CACHE_FILE_EXTS:
+                    if other_ext != ext and os.path.exists(f"{cache_base}{other_ext}"):
+                        os.remove(f"{cache_base}{other_ext}")
                 logger.info(f"缓存已保存: {cache_file}")
             except Exception as e:
                 logger.warning(f"缓存保存失败: {e}")
 
             return result
+
+        def cache_clear():
+            """清空该函数的进程内缓存 (磁盘缓存不受影响)"""
+            with memo_lock:
+                memo.clear()
+
+        wrapper.cache_clear = cache_clear
         return wrapper
     return decorator
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=4, max=10),
-    retry=retry_if_exception_type((requests.exceptions.RequestException, ConnectionError)),
-    reraise=True
-)
+# 共享 HTTP 会话: 同一主机 (如 api.glassnode.com) 的请求复用 TCP/TLS 连接
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+_SESSION.mount("http://", HTTPAdapter(pool_connections=10, pool_maxsize=10))
+
+
+# 重试配置: 最多尝试次数, 退避 4s、8s... 上限 10s
+API_MAX_ATTEMPTS = 3
+API_BACKOFF_MAX_SECONDS = 10
+
+
 def robust_api_call(url: str, params: dict = None, headers: dict = None, timeout: int = 30) -> dict:
     """
     带重试机制的 API 调用
 
+    超时、连接错误、限流 (429) 和服务器错误 (5xx) 指数退避重试;
+    其余 4xx 客户端错误重试也不会成功, 直接抛出
+
     Args:
         url: API 端点
         params: 查询参数
@@ -98,8 +292,23 @@ def robust_api_call(url: str, params: dict = None, headers: dict = None, timeout
     Raises:
         requests.exceptions.RequestException: API 请求失败
     """
+    for attempt in range(1, API_MAX_ATTEMPTS + 1):
+        try:
+            return _get_json(url, params, headers, timeout)
+        except requests.exceptions.HTTPError:
+            raise
+        except (requests.exceptions.RequestException, ConnectionError):
+            if attempt == API_MAX_ATTEMPTS:
+                raise
+            delay = min(API_BACKOFF_MAX_SECONDS, 4 * 2 ** (attempt - 1))
+            logger.warning(f"第 {attempt} 次请求失败, {delay}s 后重试: {url}")
+            time.sleep(delay)
+
+
+def _get_json(url: str, params: Optional[dict], headers: Optional[dict], timeout: int) -> dict:
+    """单次 GET 请求并解析 JSON"""
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=timeout)
+        response = _SESSION.get(url, params=params, headers=headers, timeout=timeout)
 
         # 处理限流
         if response.status_code == 429:
@@ -116,7 +325,7 @@ def robust_api_call(url: str, params: dict = None, headers: dict = None, timeout
             logger.error(f"客户端错误 ({response.status_code}): {url}, 响应: {response.text}")
             response.raise_for_status()
 
-        logger.info(f"API 调用成功: {url}, 状态码: {response.status_code}")
+        logger.debug(f"API 调用成功: {url}, 状态码: {response.status_code}")
         return response.json()
 
     except requests.exceptions.Timeout:
@@ -127,6 +336,23 @@ def robust_api_call(url: str, params: dict = None, headers: dict = None, timeout
         raise
 
 
+def _iter_cache_files():
+    """遍历所有缓存文件: 缓存根目录下的 JSON/pickle 文件, 以及各分目录缓存中的文件"""
+    with os.scandir(CACHE_DIR) as entries:
+        for entry in entries:
+            if entry.name.endswith(CACHE_FILE_EXTS):
+                yield entry
+
+    for subdir in CACHE_SUBDIRS:
+        try:
+            with os.scandir(subdir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
 def clear_cache(older_than_hours: int = None):
     """
     清理缓存文件
@@ -138,24 +364,30 @@ def clear_cache(older_than_hours: int = None):
         logger.info("缓存目录不存在,无需清理")
         return
 
-    count = 0
-    for filename in os.listdir(CACHE_DIR):
-        filepath = os.path.join(CACHE_DIR, filename)
+    # 过期阈值只算一次; scandir 的 DirEntry 复用目录遍历得到的信息, 减少 stat 调用
+    cutoff = None
+    if older_than_hours is not None:
+        cutoff = (datetime.now() - timedelta(hours=older_than_hours)).timestamp()
 
-        if not filename.endswith('.pkl'):
-            continue
+    # 进程内缓存随磁盘缓存一起清理, 否则清理后本进程仍会返回旧结果
+    for memo, memo_lock in _MEMORY_CACHES:
+        with memo_lock:
+            if cutoff is None:
+                memo.clear()
+            else:
+                for key in [key for key, (written_at, _) in memo.items() if written_at <= cutoff]:
+                    del memo[key]
 
+    count = 0
+    for entry in _iter_cache_files():
         # 如果指定了时间,只删除过期的
-        if older_than_hours is not None:
-            file_time = datetime.fromtimestamp(os.path.getmtime(filepath))
-            if datetime.now() - file_time < timedelta(hours=older_than_hours):
-                continue
-
         try:
-            os.remove(filepath)
+            if cutoff is not None and entry.stat().st_mtime > cutoff:
+                continue
+            os.remove(entry.path)
             count += 1
         except Exception as e:
-            logger.warning(f"删除缓存文件失败: {filepath}, 错误: {e}")
+            logger.warning(f"删除缓存文件失败: {entry.path}, 错误: {e}")
 
     logger.info(f"缓存清理完成,删除了 {count} 个文件")
 
@@ -170,25 +402,59 @@ def get_cache_info() -> dict:
     if not os.path.exists(CACHE_DIR):
         return {"count": 0, "total_size_mb": 0, "oldest": None, "newest": None}
 
-    files = [f for f in os.listdir(CACHE_DIR) if f.endswith('.pkl')]
+    # 单次遍历累计大小与最早/最新修改时间
+    count = 0
+    total_size = 0
+    oldest_ts = newest_ts = None
+    for entry in _iter_cache_files():
+        try:
+            stat = entry.stat()
+        except OSError:
+            continue
+        count += 1
+        total_size += stat.st_size
+        oldest_ts = stat.st_mtime if oldest_ts is None else min(oldest_ts, stat.st_mtime)
+        newest_ts = stat.st_mtime if newest_ts is None else max(newest_ts, stat.st_mtime)
 
-    if not files:
+    if not count:
         return {"count": 0, "total_size_mb": 0, "oldest": None, "newest": None}
 
-    total_size = sum(os.path.getsize(os.path.join(CACHE_DIR, f)) for f in files)
-
-    file_times = [os.path.getmtime(os.path.join(CACHE_DIR, f)) for f in files]
-    oldest = datetime.fromtimestamp(min(file_times)).strftime('%Y-%m-%d %H:%M:%S')
-    newest = datetime.fromtimestamp(max(file_times)).strftime('%Y-%m-%d %H:%M:%S')
+    oldest = datetime.fromtimestamp(oldest_ts).strftime('%Y-%m-%d %H:%M:%S')
+    newest = datetime.fromtimestamp(newest_ts).strftime('%Y-%m-%d %H:%M:%S')
 
     return {
-        "count": len(files),
+        "count": count,
         "total_size_mb": round(total_size / (1024 * 1024), 2),
         "oldest": oldest,
         "newest": newest
     }
 
 
+def pct_change(values: Sequence[float], periods: Optional[int] = None) -> float:
+    """
+    计算最新值相对 periods 个数据点之前的涨跌幅
+
+    Args:
+        values: 数值序列 (如收盘价)
+        periods: 回溯点数, None 表示相对序列首个值
+
+    Returns:
+        涨跌幅 (%), 数据不足或基准为 0 时返回 0.0
+    """
+    if periods is None:
+        if not values:
+            return 0.0
+        base = values[0]
+    else:
+        if len(values) < periods:
+            return 0.0
+        base = values[-periods]
+
+    if not base:
+        return 0.0
+    return (values[-1] - base) / base * 100
+
+
 if __name__ == "__main__":
     # 测试代码
     @cache_api_call(cache_ttl_hours=1)
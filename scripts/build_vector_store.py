@@ -6,15 +6,32 @@ Process historical weekly reports from raw_weekly_report_data and store into Chr
 """
 
 import os
+import gzip
+import json
+import hashlib
 import sys
 import logging
 import re
+import shutil
+import sqlite3
+from array import array
+from collections import Counter
+from contextlib import closing
 from pathlib import Path
-from typing import List, Dict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
 from tqdm import tqdm
+from tenacity import retry, stop_after_attempt, wait_exponential
 from pypdf import PdfReader
+try:
+    import pypdfium2 as pdfium  # Optional: PDFium (C++) text extraction, far faster than pure-Python pypdf
+except ImportError:
+    pdfium = None
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+import chromadb
 from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
@@ -38,6 +55,19 @@ logger = logging.getLogger(__name__)
 PDF_DIR = project_root / "raw_weekly_report_data"
 CHROMA_DIR = project_root / "chroma_db"
 COLLECTION_NAME = "crypto_weekly_reports"
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# Embedding requests: texts per request and concurrent requests in flight
+EMBED_BATCH_SIZE = 512
+EMBED_WORKERS = 8
+# Documents per Chroma add call
+CHROMA_ADD_BATCH_SIZE = 1000
+# Documents per pipeline batch (embedded and stored before the next batch is chunked)
+STORE_BATCH_SIZE = 2048
+# Parsed page texts per PDF, reused while the file is unchanged (reports are immutable)
+PARSED_PDF_CACHE_DIR = project_root / "cache" / "parsed_pdfs"
+# Embeddings from previous builds, keyed by model + chunk text (survives chroma_db rebuilds)
+EMBEDDING_CACHE_PATH = project_root / "cache" / "embeddings.sqlite3"
 
 # Chinese-optimized separators (priority order)
 CHINESE_SEPARATORS = [
@@ -53,8 +83,99 @@ CHINESE_SEPARATORS = [
 ]
 
 
+# ========== Classification Keywords ==========
+
+def keyword_pattern(keywords: List[str]) -> "re.Pattern":
+    """Compile a keyword list into one alternation: a single C-level scan instead of one `in` per keyword"""
+    return re.compile("|".join(map(re.escape, keywords)))
+
+
+MACRO_KEYWORDS = keyword_pattern(["美元指数", "美债", "DXY", "US10Y", "标普500", "Nasdaq", "纳指"])
+RELATED_ASSET_KEYWORDS = keyword_pattern(["NVDA", "COIN", "MSTR", "Coinbase", "Robinhood", "Strategy"])
+BTC_TECHNICAL_KEYWORDS = keyword_pattern(["均线", "MA", "阻力", "支撑", "K线", "MACD", "RSI", "技术"])
+BTC_CAPITAL_FLOW_KEYWORDS = keyword_pattern(["ETF", "资金流", "净流入", "净流出", "Spot ETF", "资金"])
+BTC_ONCHAIN_KEYWORDS = keyword_pattern(["URPD", "链上", "鲸鱼", "地址", "Glassnode", "交易所"])
+BTC_DERIVATIVES_KEYWORDS = keyword_pattern(["期货", "期权", "未平仓", "资金费率", "OI", "衍生品"])
+BTC_SUMMARY_KEYWORDS = keyword_pattern(["因此,我们认为", "总结", "后市", "综上"])
+ETH_CAPITAL_FLOW_KEYWORDS = keyword_pattern(["资金", "ETF"])
+CONCLUSION_KEYWORDS = keyword_pattern(["因此,我们认为", "因此,我們認為", "综上", "總結", "后市大概率", "我们预计", "我們預計"])
+DATA_POINT_PATTERN = re.compile(r'[\$¥€][\d,]+|[\d.]+%|[\d.]+[KMB]')
+
+
 # ========== PDF Parsing ==========
 
+def read_page_texts(pdf_path: Path) -> List[str]:
+    """
+    Extract raw text of every page, using pypdfium2 when installed and pypdf otherwise
+    
+    Args:
+        pdf_path: Path to PDF file
+        
+    Returns:
+        List of page texts in page order
+    """
+    if pdfium is not None:
+        try:
+            pdf = pdfium.PdfDocument(pdf_path)
+            try:
+                # PDFium separates lines with \r\n; normalize so the "\n\n" splitters still apply
+                return [
+                    page.get_textpage().get_text_range().replace("\r\n", "\n")
+                    for page in pdf
+                ]
+            finally:
+                pdf.close()
+        except pdfium.PdfiumError as e:
+            logger.warning(f"⚠️  {pdf_path.name}: pdfium failed ({e}), falling back to pypdf")
+    
+    reader = PdfReader(pdf_path)
+    return [page.extract_text() for page in reader.pages]
+
+
+def parsed_cache_path(pdf_path: Path) -> Path:
+    """Location of a PDF's cached page texts"""
+    return PARSED_PDF_CACHE_DIR / f"{pdf_path.stem}.json.gz"
+
+
+def pdf_signature(pdf_path: Path) -> Dict:
+    """Identifies one version of a PDF as parsed by the current extractor"""
+    stat = pdf_path.stat()
+    return {
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+        "extractor": "pypdfium2" if pdfium is not None else "pypdf",
+    }
+
+
+def load_parsed_pages(pdf_path: Path) -> Optional[List[str]]:
+    """Return cached page texts if the PDF is unchanged since it was parsed, else None"""
+    cache_path = parsed_cache_path(pdf_path)
+    if not cache_path.exists():
+        return None
+    try:
+        with gzip.open(cache_path, "rt", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("signature") != pdf_signature(pdf_path):
+            return None
+        return cached["pages"]
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"⚠️  {pdf_path.name}: ignoring unreadable parse cache ({e})")
+        return None
+
+
+def save_parsed_pages(pdf_path: Path, page_texts: List[str]):
+    """Cache page texts (temp file + atomic replace; parse workers run concurrently)"""
+    cache_path = parsed_cache_path(pdf_path)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump({"signature": pdf_signature(pdf_path), "pages": page_texts}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"⚠️  {pdf_path.name}: failed to save parse cache ({e})")
+
+
 def extract_pdf_text(pdf_path: Path) -> List[Dict]:
     """
     Extract text from PDF with metadata
@@ -66,15 +187,16 @@ def extract_pdf_text(pdf_path: Path) -> List[Dict]:
         List of dicts with text and metadata
     """
     try:
-        reader = PdfReader(pdf_path)
+        page_texts = load_parsed_pages(pdf_path)
+        if page_texts is None:
+            page_texts = read_page_texts(pdf_path)
+            save_parsed_pages(pdf_path, page_texts)
         
         # Extract date from filename (format: 2025-11-17.pdf)
         date = pdf_path.stem
         
         chunks = []
-        for page_num, page in enumerate(reader.pages, start=1):
-            text = page.extract_text()
-            
+        for page_num, text in enumerate(page_texts, start=1):
             if not text or len(text.strip()) < 50:
                 continue
                 
@@ -107,9 +229,9 @@ def classify_section_and_type(text: str) -> Dict[str, str]:
     analysis_type = "Other"
     
     # Identify section
-    if any(kw in text for kw in ["美元指数", "美债", "DXY", "US10Y", "标普500", "Nasdaq", "纳指"]):
+    if MACRO_KEYWORDS.search(text):
         section = "Macro"
-        if any(kw in text for kw in ["NVDA", "COIN", "MSTR", "Coinbase", "Robinhood", "Strategy"]):
+        if RELATED_ASSET_KEYWORDS.search(text):
             analysis_type = "Related Assets"
         else:
             analysis_type = "Macro Environment"
@@ -118,20 +240,20 @@ def classify_section_and_type(text: str) -> Dict[str, str]:
         section = "BTC Analysis"
         
         # Identify analysis type
-        if any(kw in text for kw in ["均线", "MA", "阻力", "支撑", "K线", "MACD", "RSI", "技术"]):
+        if BTC_TECHNICAL_KEYWORDS.search(text):
             analysis_type = "Technical Analysis"
-        elif any(kw in text for kw in ["ETF", "资金流", "净流入", "净流出", "Spot ETF", "资金"]):
+        elif BTC_CAPITAL_FLOW_KEYWORDS.search(text):
             analysis_type = "Capital Flow"
-        elif any(kw in text for kw in ["URPD", "链上", "鲸鱼", "地址", "Glassnode", "交易所"]):
+        elif BTC_ONCHAIN_KEYWORDS.search(text):
             analysis_type = "On-Chain Data"
-        elif any(kw in text for kw in ["期货", "期权", "未平仓", "资金费率", "OI", "衍生品"]):
+        elif BTC_DERIVATIVES_KEYWORDS.search(text):
             analysis_type = "Derivatives"
-        elif any(kw in text for kw in ["因此,我们认为", "总结", "后市", "综上"]):
+        elif BTC_SUMMARY_KEYWORDS.search(text):
             analysis_type = "Summary"
     
     elif "ETH" in text or "以太坊" in text or "ethereum" in text.lower():
         section = "ETH Analysis"
-        if any(kw in text for kw in ["资金", "ETF"]):
+        if ETH_CAPITAL_FLOW_KEYWORDS.search(text):
             analysis_type = "Capital Flow"
         else:
             analysis_type = "Technical Analysis"
@@ -139,47 +261,126 @@ def classify_section_and_type(text: str) -> Dict[str, str]:
     return {"section": section, "analysis_type": analysis_type}
 
 
+def chunk_id(metadata: Dict, granularity: str, chunk: str) -> str:
+    """Stable chunk id (same PDF page + granularity + text -> same id), used to dedupe multi-query results"""
+    key = f"{metadata['filename']}|{metadata['page']}|{granularity}|{chunk}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=12).hexdigest()
+
+
 def has_data_points(text: str) -> bool:
     """Check if text contains data points (numbers with units)"""
-    pattern = r'[\$¥€][\d,]+|[\d.]+%|[\d.]+[KMB]'
-    return bool(re.search(pattern, text))
+    return bool(DATA_POINT_PATTERN.search(text))
 
 
 def is_conclusion(text: str) -> bool:
     """Check if text is a conclusion paragraph"""
-    conclusion_keywords = ["因此,我们认为", "因此,我們認為", "综上", "總結", "后市大概率", "我们预计", "我們預計"]
-    return any(kw in text for kw in conclusion_keywords)
+    return bool(CONCLUSION_KEYWORDS.search(text))
 
 
-# ========== Vectorization ==========
+# ========== Embedding Cache ==========
 
-def build_vector_store():
-    """Build the vector store"""
-    
-    logger.info("=" * 60)
-    logger.info("🚀 Starting RAG Vector Store Build")
-    logger.info("=" * 60)
-    
-    # 1. Collect all PDFs
-    pdf_files = sorted(PDF_DIR.glob("*.pdf"))
-    logger.info(f"📂 Found {len(pdf_files)} PDF files")
+def embedding_key(text: str) -> bytes:
+    """Cache key: model + exact text, so a model switch never reuses stale vectors"""
+    return hashlib.blake2b(f"{EMBEDDING_MODEL}\x1f{text}".encode("utf-8"), digest_size=16).digest()
+
+
+def load_cached_embeddings(conn: sqlite3.Connection, keys: List[bytes]) -> Dict[bytes, List[float]]:
+    """Look up cached vectors (queried in chunks to stay under SQLite's variable limit)"""
+    found = {}
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i+500]
+        placeholders = ",".join("?" * len(chunk))
+        for key, blob in conn.execute(f"SELECT hash, vec FROM embeddings WHERE hash IN ({placeholders})", chunk):
+            vec = array("d")
+            vec.frombytes(blob)
+            found[key] = vec.tolist()
+    return found
+
+
+def embed_texts_cached(embeddings: OpenAIEmbeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embed texts, reusing vectors from previous builds
     
-    if not pdf_files:
-        logger.error(f"❌ No PDF files found in: {PDF_DIR}")
-        return
+    Each rebuild re-reads every historical report; only chunks not seen before
+    are sent to the embedding API
     
-    # 2. Parse PDFs
-    all_raw_chunks = []
-    logger.info("📄 Parsing PDF files...")
-    for pdf_path in tqdm(pdf_files, desc="Parsing PDFs"):
-        chunks = extract_pdf_text(pdf_path)
-        all_raw_chunks.extend(chunks)
+    Returns:
+        Vectors in the same order as texts
+    """
+    keys = [embedding_key(text) for text in texts]
     
-    logger.info(f"✅ Extracted {len(all_raw_chunks)} raw pages")
+    EMBEDDING_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    with closing(sqlite3.connect(EMBEDDING_CACHE_PATH)) as conn:
+        conn.execute("CREATE TABLE IF NOT EXISTS embeddings (hash BLOB PRIMARY KEY, vec BLOB)")
+        vectors = load_cached_embeddings(conn, keys)
+        
+        # Fine and coarse chunks (and page overlaps) repeat texts; embed each unique text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        logger.info(
+            f"📦 Embedding cache: {len(texts)} chunks, {len(set(keys))} unique, "
+            f"{len(missing)} to embed"
+        )
+        
+        if missing:
+            new_vectors = embed_texts(embeddings, list(missing.values()))
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (hash, vec) VALUES (?, ?)",
+                    [(key, array("d", vec).tobytes()) for key, vec in zip(missing, new_vectors)]
+                )
+            vectors.update(zip(missing, new_vectors))
+    
+    return [vectors[key] for key in keys]
+
+
+# ========== Vectorization ==========
+
+@retry(stop=stop_after_attempt(5), wait=wait_exponential(multiplier=1, min=2, max=30), reraise=True)
+def embed_batch(embeddings: OpenAIEmbeddings, texts: List[str]) -> List[List[float]]:
+    """Embed one batch of texts (retried with backoff on rate limits / transient errors)"""
+    return embeddings.embed_documents(texts)
+
+
+def embed_texts(embeddings: OpenAIEmbeddings, texts: List[str]) -> List[List[float]]:
+    """
+    Embed texts in large batches with several requests in flight
     
-    # 3. Chunk into fine and coarse granularities
-    logger.info("✂️  Chunking text...")
+    The bottleneck is request round-trips, not tokens, so fewer, bigger and
+    overlapping requests cut wall time
     
+    Returns:
+        Vectors in the same order as texts
+    """
+    batches = [texts[i:i+EMBED_BATCH_SIZE] for i in range(0, len(texts), EMBED_BATCH_SIZE)]
+    vectors = []
+    with ThreadPoolExecutor(max_workers=EMBED_WORKERS) as executor:
+        for batch_vectors in tqdm(
+            executor.map(partial(embed_batch, embeddings), batches),
+            total=len(batches),
+            desc="Vectorizing"
+        ):
+            vectors.extend(batch_vectors)
+    return vectors
+
+
+def iter_pages(pdf_files: List[Path]) -> Iterator[Dict]:
+    """Yield extracted pages; pypdf is pure Python and CPU-bound, so files are parsed in parallel processes"""
+    workers = min(len(pdf_files), os.cpu_count() or 1)
+    chunksize = max(1, len(pdf_files) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for pages in tqdm(
+            executor.map(extract_pdf_text, pdf_files, chunksize=chunksize),
+            total=len(pdf_files),
+            desc="Parsing PDFs"
+        ):
+            yield from pages
+
+
+def iter_documents(pages: Iterable[Dict]) -> Iterator[Document]:
+    """Split each page into fine and coarse chunks with metadata"""
     # Fine-grained chunker (for specific techniques)
     fine_splitter = RecursiveCharacterTextSplitter(
         separators=CHINESE_SEPARATORS,
@@ -196,88 +397,131 @@ def build_vector_store():
         length_function=len,
     )
     
-    all_documents = []
-    
-    for raw_chunk in tqdm(all_raw_chunks, desc="Chunking with metadata"):
+    for raw_chunk in pages:
         text = raw_chunk["text"]
+        # Page-level fields plus section/type classification, built once per page
         base_metadata = {
             "date": raw_chunk["date"],
             "year_month": raw_chunk["date"][:7],
             "page": raw_chunk["page"],
             "filename": raw_chunk["filename"],
+            **classify_section_and_type(text),
         }
         
-        # Classify section and type
-        classification = classify_section_and_type(text)
-        base_metadata.update(classification)
-        
-        # Fine-grained chunks
-        fine_chunks = fine_splitter.split_text(text)
-        for chunk in fine_chunks:
-            metadata = base_metadata.copy()
-            metadata["granularity"] = "fine"
-            metadata["word_count"] = len(chunk)
-            metadata["has_data"] = has_data_points(chunk)
-            metadata["is_conclusion"] = is_conclusion(chunk)
-            
-            all_documents.append(Document(
-                page_content=chunk,
-                metadata=metadata
-            ))
-        
-        # Coarse-grained chunks
-        coarse_chunks = coarse_splitter.split_text(text)
-        for chunk in coarse_chunks:
-            metadata = base_metadata.copy()
-            metadata["granularity"] = "coarse"
-            metadata["word_count"] = len(chunk)
-            metadata["has_data"] = has_data_points(chunk)
-            metadata["is_conclusion"] = is_conclusion(chunk)
-            
-            all_documents.append(Document(
-                page_content=chunk,
-                metadata=metadata
-            ))
+        # Fine- and coarse-grained chunks; metadata built as one dict literal per chunk
+        for granularity, splitter in (("fine", fine_splitter), ("coarse", coarse_splitter)):
+            for chunk in splitter.split_text(text):
+                yield Document(
+                    page_content=chunk,
+                    metadata={
+                        **base_metadata,
+                        "granularity": granularity,
+                        "chunk_id": chunk_id(base_metadata, granularity, chunk),
+                        "word_count": len(chunk),
+                        "has_data": has_data_points(chunk),
+                        "is_conclusion": is_conclusion(chunk),
+                    }
+                )
+
+
+def store_batch(collection, embeddings: OpenAIEmbeddings, batch: List[Document], offset: int):
+    """Embed one batch of documents and add it with its precomputed vectors"""
+    vectors = embed_texts_cached(embeddings, [doc.page_content for doc in batch])
+    
+    # Chroma caps the size of a single add
+    for i in range(0, len(batch), CHROMA_ADD_BATCH_SIZE):
+        add_batch = batch[i:i+CHROMA_ADD_BATCH_SIZE]
+        collection.add(
+            ids=[
+                f"{doc.metadata['chunk_id']}-{offset + i + j}"
+                for j, doc in enumerate(add_batch)
+            ],
+            embeddings=vectors[i:i+CHROMA_ADD_BATCH_SIZE],
+            documents=[doc.page_content for doc in add_batch],
+            metadatas=[doc.metadata for doc in add_batch]
+        )
+
+
+def build_vector_store():
+    """Build the vector store"""
+    
+    logger.info("=" * 60)
+    logger.info("🚀 Starting RAG Vector Store Build")
+    logger.info("=" * 60)
     
-    logger.info(f"✅ Generated {len(all_documents)} document chunks")
+    # 1. Collect all PDFs
+    pdf_files = sorted(PDF_DIR.glob("*.pdf"))
+    logger.info(f"📂 Found {len(pdf_files)} PDF files")
+    
+    if not pdf_files:
+        logger.error(f"❌ No PDF files found in: {PDF_DIR}")
+        return
     
-    # 4. Vectorize and store
-    logger.info("🔮 Vectorizing with OpenAI text-embedding-3-small...")
+    # 2-4. Stream pages -> chunks -> embedding batches -> Chroma
+    # Parsing, chunking and embedding overlap; at most two batches are held in memory
+    logger.info("📄 Parsing, chunking and vectorizing...")
+    logger.info(f"🔮 Vectorizing with OpenAI {EMBEDDING_MODEL}...")
     logger.info("⚠️  This may take several minutes...")
 
     # Use EMBEDDING env var if available, otherwise fall back to OPENAI_API_KEY
     embedding_api_key = os.getenv("EMBEDDING") or os.getenv("EMBEDDINGS") or os.getenv("OPENAI_API_KEY")
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=embedding_api_key)
+    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL, openai_api_key=embedding_api_key)
+    
+    # Build into a staging directory; the old store is replaced only after a successful build
+    building_dir = CHROMA_DIR.with_name(CHROMA_DIR.name + ".building")
+    if building_dir.exists():
+        shutil.rmtree(building_dir)
+    
+    # Write through the bare chromadb client: vectors are computed in bulk above it,
+    # so LangChain's per-document wrapper adds nothing during the build
+    client = chromadb.PersistentClient(path=str(building_dir))
+    collection = client.get_or_create_collection(COLLECTION_NAME)
+    
+    total_documents = 0
+    sections = Counter()
+    analysis_types = Counter()
+    documents = iter_documents(iter_pages(pdf_files))
+    
+    # Embedding + storing batch N runs on a worker thread while batch N+1 is chunked here;
+    # at most one batch is in flight, so memory stays bounded to two batches
+    with ThreadPoolExecutor(max_workers=1) as store_executor:
+        pending = None
+        while True:
+            batch = list(islice(documents, STORE_BATCH_SIZE))
+            if pending is not None:
+                pending.result()  # Re-raises embedding / Chroma errors
+                pending = None
+            if not batch:
+                break
+            
+            pending = store_executor.submit(store_batch, collection, embeddings, batch, total_documents)
+            
+            total_documents += len(batch)
+            sections.update(doc.metadata.get("section", "Unknown") for doc in batch)
+            analysis_types.update(doc.metadata.get("analysis_type", "Unknown") for doc in batch)
     
-    # Remove old vector store if exists
+    if total_documents == 0:
+        logger.error("❌ No document chunks generated")
+        shutil.rmtree(building_dir, ignore_errors=True)
+        return
+    
+    # Swap the new store in
+    del collection, client
     if CHROMA_DIR.exists():
         logger.warning(f"⚠️  Removing old vector store: {CHROMA_DIR}")
-        import shutil
         shutil.rmtree(CHROMA_DIR)
+    building_dir.rename(CHROMA_DIR)
     
-    # Batch add to avoid oversized requests
-    batch_size = 100
-    vector_store = None
-    
-    for i in tqdm(range(0, len(all_documents), batch_size), desc="Vectorizing"):
-        batch = all_documents[i:i+batch_size]
-        
-        if vector_store is None:
-            # First batch - create store
-            vector_store = Chroma.from_documents(
-                documents=batch,
-                embedding=embeddings,
-                collection_name=COLLECTION_NAME,
-                persist_directory=str(CHROMA_DIR)
-            )
-        else:
-            # Subsequent batches - add to existing
-            vector_store.add_documents(batch)
+    vector_store = Chroma(
+        collection_name=COLLECTION_NAME,
+        embedding_function=embeddings,
+        persist_directory=str(CHROMA_DIR)
+    )
     
     logger.info(f"✅ Vector store built!")
     logger.info(f"📊 Location: {CHROMA_DIR}")
     logger.info(f"📊 Collection: {COLLECTION_NAME}")
-    logger.info(f"📊 Total documents: {len(all_documents)}")
+    logger.info(f"📊 Total documents: {total_documents}")
     
     # 5. Verification
     logger.info("\n" + "=" * 60)
@@ -316,16 +560,6 @@ def build_vector_store():
     logger.info("📈 Vector Store Statistics")
     logger.info("=" * 60)
     
-    sections = {}
-    analysis_types = {}
-    
-    for doc in all_documents:
-        section = doc.metadata.get("section", "Unknown")
-        analysis_type = doc.metadata.get("analysis_type", "Unknown")
-        
-        sections[section] = sections.get(section, 0) + 1
-        analysis_types[analysis_type] = analysis_types.get(analysis_type, 0) + 1
-    
     logger.info(f"\n📊 Section Distribution:")
     for section, count in sorted(sections.items(), key=lambda x: x[1], reverse=True):
         logger.info(f"   - {section}: {count} documents")
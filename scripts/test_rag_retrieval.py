@@ -79,13 +79,17 @@ def test_basic_retrieval():
         filter={"$and": [{"section": "BTC Analysis"}, {"granularity": "fine"}]}
     )
 
-    print(f"\n找到 {len(results)} 个相关文档:\n")
+    # 结果拼接后一次输出
+    lines = [f"\n找到 {len(results)} 个相关文档:\n"]
     for i, doc in enumerate(results, 1):
-        print(f"📄 结果 {i}:")
-        print(f"   日期: {doc.metadata.get('date')}")
-        print(f"   类型: {doc.metadata.get('analysis_type')}")
-        print(f"   内容: {doc.page_content[:100]}...")
-        print()
+        lines += [
+            f"📄 结果 {i}:",
+            f"   日期: {doc.metadata.get('date')}",
+            f"   类型: {doc.metadata.get('analysis_type')}",
+            f"   内容: {doc.page_content[:100]}...",
+            "",
+        ]
+    print("\n".join(lines))
 
 if __name__ == "__main__":
     test_basic_retrieval()